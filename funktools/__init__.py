@@ -2,9 +2,30 @@ import typing
 
 
 def __getattr__(attr: str) -> typing.Callable:
-    if attr == "CLI":
+    if attr == "Backend":
+        from ._backend import Backend
+        return Backend
+    elif attr == "BlobBackend":
+        from ._backend import BlobBackend
+        return BlobBackend
+    elif attr == "CLI":
         from ._cli import Decorator as CLI
         return CLI
+    elif attr == "DBMBackend":
+        from ._backend import DBMBackend
+        return DBMBackend
+    elif attr == "dumps_array":
+        from ._numpy import dumps_array
+        return dumps_array
+    elif attr == "FilesystemBackend":
+        from ._backend import FilesystemBackend
+        return FilesystemBackend
+    elif attr == "LeaseBackend":
+        from ._backend import LeaseBackend
+        return LeaseBackend
+    elif attr == "loads_array":
+        from ._numpy import loads_array
+        return loads_array
     elif attr == "Log":
         from ._log import Decorator as Log
         return Log
@@ -14,9 +35,15 @@ def __getattr__(attr: str) -> typing.Callable:
     elif attr == "Retry":
         from ._retry import Decorator as Retry
         return Retry
+    elif attr == "ShardedBackend":
+        from ._backend import ShardedBackend
+        return ShardedBackend
     elif attr == "SQLiteCache":
         from ._sqlite_cache import Decorator as SQLiteCache
         return SQLiteCache
+    elif attr == "SQLiteBackend":
+        from ._backend import SQLiteBackend
+        return SQLiteBackend
     elif attr == "Throttle":
         from ._throttle import Decorator as Throttle
         return Throttle
@@ -34,10 +61,19 @@ def __getattr__(attr: str) -> typing.Callable:
 
 
 __all__ = [
+    'Backend',
+    'BlobBackend',
     'CLI',
+    'DBMBackend',
+    'dumps_array',
+    'FilesystemBackend',
+    'LeaseBackend',
+    'loads_array',
     'Log',
     'LRUCache',
     'Retry',
+    'ShardedBackend',
+    'SQLiteBackend',
     'SQLiteCache',
     'Throttle',
     'Template',
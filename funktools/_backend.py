@@ -0,0 +1,959 @@
+from __future__ import annotations
+
+import annotated_types
+import atexit
+import contextlib
+import dataclasses
+import dbm
+import functools
+import hashlib
+import itertools
+import marshal
+import mmap
+import os
+import pathlib
+import random
+import shutil
+import tempfile
+import textwrap
+import threading
+import time
+import typing
+
+import sqlite3
+
+type CanonicalKey = str
+type Key = bytes | CanonicalKey
+type Namespace = str
+type Value = bytes | memoryview | str
+
+# A stored value and, if kept for collision checks, the canonical key it was stored under.
+type Row = tuple[Value, CanonicalKey | None]
+
+
+@typing.runtime_checkable
+class Backend(typing.Protocol):
+    """Storage for persistent caches. Rows are addressed by `(namespace, key)`.
+
+    A backend instance stores the rows of one decorated function.
+    """
+
+    def delete(self, namespace: Namespace, key: Key) -> None: ...
+
+    def get(self, namespace: Namespace, key: Key) -> Row | None: ...
+
+    def get_many(self, namespace: Namespace, keys: typing.Iterable[Key]) -> dict[Key, Row]: ...
+
+    def purge(self) -> None: ...
+
+    def put(self, namespace: Namespace, key: Key, row: Row) -> None: ...
+
+    def put_many(self, items: typing.Iterable[tuple[tuple[Namespace, Key], Row]]) -> None: ...
+
+    def scan(self) -> typing.Iterator[tuple[Namespace, Key, Row]]: ...
+
+    def set_version(self, version: str) -> None:
+        """Records `version`, purging rows if they were stored under a different version."""
+
+
+@typing.runtime_checkable
+class LeaseBackend(Backend, typing.Protocol):
+    """Backend that can lease keys to one computing process at a time. Putting a row releases its lease."""
+
+    def acquire_lease(self, namespace: Namespace, key: Key, duration: float) -> bool: ...
+
+    def release_lease(self, namespace: Namespace, key: Key) -> None: ...
+
+
+def dumps_item(item: tuple) -> bytes:
+    """Serializes a tuple of keys and values deterministically.
+
+    Marshal format version 2 is used because later versions emit back-references that depend on reference counts.
+    """
+    return marshal.dumps(item, 2)
+
+
+def write_file(path: pathlib.Path, data: bytes | memoryview) -> None:
+    """Writes `data` to a temporary file beside `path` and renames it into place, so readers never see partial files."""
+    path.parent.mkdir(exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f'.{path.name}.', delete=False) as f:
+        try:
+            f.write(data)
+        except BaseException:
+            os.unlink(f.name)
+            raise
+    os.replace(f.name, path)
+
+
+@contextlib.contextmanager
+def transaction(connection: sqlite3.Connection, lock: threading.Lock) -> typing.Iterator[None]:
+    with lock:
+        connection.execute('BEGIN')
+        try:
+            yield
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+
+@dataclasses.dataclass(frozen=True, kw_only=True)
+class Statements:
+    """SQL for the table `table_name`, formatted once per table instead of on every query."""
+    table_name: str
+
+    get_many_by_size: dict[int, str] = dataclasses.field(default_factory=dict)
+
+    columns: typing.ClassVar[tuple[str, ...]] = ('namespace', 'key', 'canonical_key', 'value', 'last_access')
+
+    @functools.cached_property
+    def lease_table_name(self) -> str:
+        return f'{self.table_name}__lease'
+
+    @functools.cached_property
+    def acquire_lease(self) -> str:
+        return textwrap.dedent(f'''
+            INSERT INTO `{self.lease_table_name}` (namespace, key, expire) VALUES (?, ?, ?)
+            ON CONFLICT (namespace, key) DO UPDATE SET expire = excluded.expire WHERE expire < ?
+        ''').strip()
+
+    add_stats: typing.ClassVar[str] = textwrap.dedent('''
+        INSERT INTO `__funktools_stats__` (table_name, hits, misses) VALUES (?, ?, ?)
+        ON CONFLICT (table_name) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses
+    ''').strip()
+
+    create_stats_table: typing.ClassVar[str] = textwrap.dedent('''
+        CREATE TABLE IF NOT EXISTS `__funktools_stats__` (
+            table_name TEXT PRIMARY KEY NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            misses INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''').strip()
+
+    create_versions_table: typing.ClassVar[str] = textwrap.dedent('''
+        CREATE TABLE IF NOT EXISTS `__funktools_versions__` (
+            table_name TEXT PRIMARY KEY NOT NULL,
+            version TEXT NOT NULL
+        ) WITHOUT ROWID
+    ''').strip()
+
+    get_version: typing.ClassVar[str] = 'SELECT version FROM `__funktools_versions__` WHERE table_name = ?'
+
+    set_version: typing.ClassVar[str] = (
+        'INSERT OR REPLACE INTO `__funktools_versions__` (table_name, version) VALUES (?, ?)'
+    )
+
+    @functools.cached_property
+    def create_index(self) -> str:
+        return f'CREATE INDEX IF NOT EXISTS `{self.table_name}__last_access` ON `{self.table_name}` (last_access)'
+
+    @functools.cached_property
+    def create_lease_table(self) -> str:
+        return textwrap.dedent(f'''
+            CREATE TABLE IF NOT EXISTS `{self.lease_table_name}` (
+                namespace TEXT NOT NULL,
+                key BLOB NOT NULL,
+                expire REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID
+        ''').strip()
+
+    @functools.cached_property
+    def create_table(self) -> str:
+        return textwrap.dedent(f'''
+            CREATE TABLE IF NOT EXISTS `{self.table_name}` (
+                namespace TEXT NOT NULL,
+                key BLOB NOT NULL,
+                canonical_key TEXT,
+                value BLOB NOT NULL,
+                last_access REAL NOT NULL DEFAULT 0.0,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID
+        ''').strip()
+
+    @functools.cached_property
+    def delete(self) -> str:
+        return f'DELETE FROM `{self.table_name}` WHERE namespace = ? AND key = ?'
+
+    @functools.cached_property
+    def drop_table(self) -> str:
+        return f'DROP TABLE IF EXISTS `{self.table_name}`'
+
+    @functools.cached_property
+    def coldest(self) -> str:
+        return textwrap.dedent(f'''
+            SELECT namespace, key, LENGTH(key) + IFNULL(LENGTH(canonical_key), 0) + LENGTH(value)
+            FROM `{self.table_name}` ORDER BY last_access, namespace, key LIMIT ?
+        ''').strip()
+
+    @functools.cached_property
+    def get(self) -> str:
+        return f'SELECT value, canonical_key FROM `{self.table_name}` WHERE namespace = ? AND key = ?'
+
+    def get_many(self, size: int) -> str:
+        if (statement := self.get_many_by_size.get(size)) is None:
+            statement = self.get_many_by_size[size] = textwrap.dedent(f'''
+                SELECT key, value, canonical_key FROM `{self.table_name}`
+                WHERE namespace = ? AND key IN ({', '.join('?' * size)})
+            ''').strip()
+        return statement
+
+    @functools.cached_property
+    def purge(self) -> str:
+        return f'DELETE FROM `{self.table_name}`'
+
+    @functools.cached_property
+    def put(self) -> str:
+        return textwrap.dedent(f'''
+            INSERT OR REPLACE INTO `{self.table_name}` (namespace, key, canonical_key, value, last_access)
+            VALUES (?, ?, ?, ?, ?)
+        ''').strip()
+
+    @functools.cached_property
+    def release_lease(self) -> str:
+        return f'DELETE FROM `{self.lease_table_name}` WHERE namespace = ? AND key = ?'
+
+    @functools.cached_property
+    def scan(self) -> str:
+        return f'SELECT namespace, key, value, canonical_key FROM `{self.table_name}`'
+
+    @functools.cached_property
+    def table_info(self) -> str:
+        return f'PRAGMA table_info(`{self.table_name}`)'
+
+    @functools.cached_property
+    def totals(self) -> str:
+        return textwrap.dedent(f'''
+            SELECT COUNT(*), IFNULL(SUM(LENGTH(key) + IFNULL(LENGTH(canonical_key), 0) + LENGTH(value)), 0)
+            FROM `{self.table_name}`
+        ''').strip()
+
+    @functools.cached_property
+    def touch(self) -> str:
+        return f'UPDATE `{self.table_name}` SET last_access = ? WHERE namespace = ? AND key = ?'
+
+
+@dataclasses.dataclass(kw_only=True)
+class Evictor:
+    """Keeps a table under `max_rows` rows and `max_bytes` bytes of keys and values, least recently accessed rows first.
+
+    Recency is approximate. Only a `touch_sample` fraction of hits records an access time, and recorded times are
+    written in batches of `touch_size`. Bounds are enforced once every `evict_every` inserts, so the table may briefly
+    hold up to `evict_every` rows beyond its bounds.
+
+    Rows and bytes are kept as running totals, so enforcing bounds deletes just the rows over them from the cold end
+    of the `last_access` index rather than scanning the table. Overwritten rows and rows written by other processes
+    make the totals drift, so they are recounted every `recount_every` evictions.
+    """
+    connection: sqlite3.Connection
+    evict_every: typing.Annotated[int, annotated_types.Gt(0)]
+    max_bytes: typing.Annotated[int, annotated_types.Ge(0)] | None
+    max_rows: typing.Annotated[int, annotated_types.Ge(0)] | None
+    statements: Statements
+    touch_sample: typing.Annotated[float, annotated_types.Interval[float](ge=0.0, le=1.0)]
+    touch_size: typing.Annotated[int, annotated_types.Gt(0)]
+    transaction_lock: threading.Lock
+
+    evictions: int = 0
+    inserts: int = 0
+    lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+    total_bytes: int | None = None
+    total_rows: int | None = None
+    touched: dict[tuple[Namespace, Key], float] = dataclasses.field(default_factory=dict)
+
+    recount_every: typing.ClassVar[int] = 64
+
+    def _flush_touched(self) -> None:
+        with self.lock:
+            touched, self.touched = self.touched, {}
+        if not touched:
+            return
+
+        with transaction(self.connection, self.transaction_lock):
+            self.connection.executemany(
+                self.statements.touch,
+                [(last_access, namespace, key) for (namespace, key), last_access in touched.items()],
+            )
+
+    def _excess(self) -> tuple[int, int]:
+        """Returns how many rows and bytes the table holds beyond its bounds."""
+        with self.lock:
+            return (
+                0 if self.max_rows is None else self.total_rows - self.max_rows,
+                0 if self.max_bytes is None else self.total_bytes - self.max_bytes,
+            )
+
+    def evict(self) -> None:
+        self._flush_touched()
+
+        with transaction(self.connection, self.transaction_lock):
+            if self.evictions % self.recount_every == 0:
+                total_rows, total_bytes = self.connection.execute(self.statements.totals).fetchone()
+                with self.lock:
+                    self.total_rows, self.total_bytes = total_rows, total_bytes
+            self.evictions += 1
+
+            while max(excess := self._excess()) > 0:
+                excess_rows, excess_bytes = excess
+                if not (coldest := self.connection.execute(
+                    self.statements.coldest, (max(excess_rows, self.evict_every),)
+                ).fetchall()):
+                    break
+                evicted = []
+                for namespace, key, size in coldest:
+                    if excess_rows <= 0 and excess_bytes <= 0:
+                        break
+                    evicted.append((namespace, key))
+                    excess_rows, excess_bytes = excess_rows - 1, excess_bytes - size
+                self.connection.executemany(self.statements.delete, evicted)
+                with self.lock:
+                    self.total_rows -= len(evicted)
+                    self.total_bytes -= sum(size for _, _, size in coldest[:len(evicted)])
+
+    def inserted(self, n: int = 1, size: int = 0) -> None:
+        """Counts `n` inserted rows of `size` bytes in total, and enforces bounds once every `evict_every` rows."""
+        with self.lock:
+            if self.total_rows is not None:
+                self.total_rows += n
+                self.total_bytes += size
+            self.inserts += n
+            if self.inserts < self.evict_every:
+                return
+            self.inserts = 0
+
+        self.evict()
+
+    def touch(self, namespace: Namespace, key: Key) -> None:
+        if random.random() >= self.touch_sample:
+            return
+
+        with self.lock:
+            self.touched[(namespace, key)] = time.time()
+            if len(self.touched) < self.touch_size:
+                return
+
+        self._flush_touched()
+
+
+@dataclasses.dataclass(kw_only=True)
+class Counts:
+    """Hits and misses counted by one thread, so that lookups count without taking a lock."""
+    hits: int = 0
+    misses: int = 0
+
+
+@dataclasses.dataclass(kw_only=True)
+class SQLiteBackend(LeaseBackend):
+    """Stores rows in the WITHOUT ROWID table `table_name` of the SQLite database at `db_path`.
+
+    If either bound is set, least recently accessed rows are evicted so that the table holds no more than `max_rows`
+    rows and `max_bytes` bytes of keys and values. Bounds are enforced every `evict_every` inserts. Access times are
+    recorded for a `touch_sample` fraction of hits and written in batches of `touch_size`.
+
+    A table of the same name with other columns, e.g. written by an older version, is dropped and created anew.
+
+    Leases are kept in a `{table_name}__lease` table, created up front if `leases` is True and otherwise on first use.
+    `get_many` looks up at most `get_many_chunk_size` keys per query.
+
+    Hits and misses of lookups that reach the table are counted per thread and added to the `__funktools_stats__`
+    table by `flush_stats`, which runs at exit and, if `stats_interval` is set, every `stats_interval` seconds on a
+    daemon thread.
+
+    SQL is formatted once per table and lookups reuse one cursor per thread. The connection keeps up to
+    `cached_statements` compiled statements, which should cover every statement in `Statements` plus the distinct
+    `get_many` sizes in use, so that hits never recompile SQL.
+    """
+    db_path: pathlib.Path | str = 'file::memory:?cache=shared'
+    table_name: str
+
+    cached_statements: typing.Annotated[int, annotated_types.Ge(0)] = 128
+    evict_every: typing.Annotated[int, annotated_types.Gt(0)] = 64
+    get_many_chunk_size: typing.Annotated[int, annotated_types.Gt(0)] = 512
+    max_bytes: typing.Annotated[int, annotated_types.Ge(0)] | None = None
+    max_rows: typing.Annotated[int, annotated_types.Ge(0)] | None = None
+    touch_sample: typing.Annotated[float, annotated_types.Interval[float](ge=0.0, le=1.0)] = 0.1
+    touch_size: typing.Annotated[int, annotated_types.Gt(0)] = 64
+    stats_interval: typing.Annotated[float, annotated_types.Gt(0.0)] | None = None
+    leases: bool = False
+
+    connection: sqlite3.Connection = dataclasses.field(init=False)
+    cursors: threading.local = dataclasses.field(default_factory=threading.local)
+    counts: list[Counts] = dataclasses.field(default_factory=list)
+    counts_by_thread: threading.local = dataclasses.field(default_factory=threading.local)
+    evictor: Evictor | None = dataclasses.field(init=False)
+    # Totals of `counts` already added to the stats table.
+    flushed: Counts = dataclasses.field(default_factory=Counts)
+    stats_lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+    statements: Statements = dataclasses.field(init=False)
+    transaction_lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+
+    def __post_init__(self) -> None:
+        self.connection = sqlite3.connect(
+            self.db_path, cached_statements=self.cached_statements, check_same_thread=False, isolation_level=None,
+        )
+        self.statements = Statements(table_name=self.table_name)
+        with transaction(self.connection, self.transaction_lock):
+            if (columns := {column for _, column, *_ in self.connection.execute(self.statements.table_info)}) and (
+                columns != {*Statements.columns}
+            ):
+                # Written by another version of funktools. Cached results can be recomputed, so it is dropped.
+                self.connection.execute(self.statements.drop_table)
+            self.connection.execute(self.statements.create_table)
+            self.connection.execute(self.statements.create_index)
+        self.connection.execute(self.statements.create_stats_table)
+        atexit.register(self._try_flush_stats)
+        if self.stats_interval is not None:
+            threading.Thread(target=self._flush_stats_every_interval, daemon=True).start()
+
+        if self.max_bytes is None and self.max_rows is None:
+            self.evictor = None
+        else:
+            self.evictor = Evictor(
+                connection=self.connection,
+                evict_every=self.evict_every,
+                max_bytes=self.max_bytes,
+                max_rows=self.max_rows,
+                statements=self.statements,
+                touch_sample=self.touch_sample,
+                touch_size=self.touch_size,
+                transaction_lock=self.transaction_lock,
+            )
+
+        if self.leases:
+            self._create_lease_table()
+
+    @property
+    def cursor(self) -> sqlite3.Cursor:
+        """Cursor of the calling thread. Results must be fetched before it is used again."""
+        try:
+            return self.cursors.cursor
+        except AttributeError:
+            cursor = self.cursors.cursor = self.connection.cursor()
+            return cursor
+
+    @property
+    def lease_table_name(self) -> str:
+        return self.statements.lease_table_name
+
+    def _create_lease_table(self) -> None:
+        self.connection.execute(self.statements.create_lease_table)
+        self.leases = True
+
+    @property
+    def thread_counts(self) -> Counts:
+        """Counts of the calling thread."""
+        try:
+            return self.counts_by_thread.counts
+        except AttributeError:
+            counts = self.counts_by_thread.counts = Counts()
+            with self.stats_lock:
+                self.counts.append(counts)
+            return counts
+
+    def _flush_stats_every_interval(self) -> None:
+        while True:
+            time.sleep(self.stats_interval)
+            self._try_flush_stats()
+
+    def _try_flush_stats(self) -> None:
+        # Stats are best-effort. The database may already be gone at exit, e.g. if it was a temporary file.
+        try:
+            self.flush_stats()
+        except sqlite3.Error:
+            ...
+
+    def flush_stats(self) -> None:
+        """Adds hits and misses counted since the last flush to the `__funktools_stats__` table."""
+        with self.stats_lock:
+            total_hits = sum(counts.hits for counts in self.counts)
+            total_misses = sum(counts.misses for counts in self.counts)
+            hits, self.flushed.hits = total_hits - self.flushed.hits, total_hits
+            misses, self.flushed.misses = total_misses - self.flushed.misses, total_misses
+        if not hits and not misses:
+            return
+
+        with transaction(self.connection, self.transaction_lock):
+            self.connection.execute(self.statements.add_stats, (self.table_name, hits, misses))
+
+    def acquire_lease(self, namespace: Namespace, key: Key, duration: float) -> bool:
+        if not self.leases:
+            self._create_lease_table()
+
+        now = time.time()
+        return bool(self.cursor.execute(self.statements.acquire_lease, (namespace, key, now + duration, now)).rowcount)
+
+    def release_lease(self, namespace: Namespace, key: Key) -> None:
+        if self.leases:
+            self.cursor.execute(self.statements.release_lease, (namespace, key))
+
+    def delete(self, namespace: Namespace, key: Key) -> None:
+        self.cursor.execute(self.statements.delete, (namespace, key))
+
+    def get(self, namespace: Namespace, key: Key) -> Row | None:
+        if (row := self.cursor.execute(self.statements.get, (namespace, key)).fetchone()) is None:
+            self.thread_counts.misses += 1
+            return None
+
+        self.thread_counts.hits += 1
+        if self.evictor is not None:
+            self.evictor.touch(namespace, key)
+
+        return row
+
+    def get_many(self, namespace: Namespace, keys: typing.Iterable[Key]) -> dict[Key, Row]:
+        rows = {}
+        keys = {*keys}
+        for batch in itertools.batched(keys, self.get_many_chunk_size):
+            for key, value, canonical_key in self.cursor.execute(
+                self.statements.get_many(len(batch)), (namespace, *batch),
+            ).fetchall():
+                rows[key] = (value, canonical_key)
+                if self.evictor is not None:
+                    self.evictor.touch(namespace, key)
+
+        counts = self.thread_counts
+        counts.hits += len(rows)
+        counts.misses += len(keys) - len(rows)
+
+        return rows
+
+    def purge(self) -> None:
+        with transaction(self.connection, self.transaction_lock):
+            self.connection.execute(self.statements.purge)
+
+    def put(self, namespace: Namespace, key: Key, row: Row) -> None:
+        self.put_many([((namespace, key), row)])
+
+    def put_many(self, items: typing.Iterable[tuple[tuple[Namespace, Key], Row]]) -> None:
+        now = time.time()
+        items = [*items]
+        with transaction(self.connection, self.transaction_lock):
+            self.connection.executemany(
+                self.statements.put,
+                [(namespace, key, canonical_key, value, now) for (namespace, key), (value, canonical_key) in items],
+            )
+            if self.leases:
+                self.connection.executemany(self.statements.release_lease, [item for item, _ in items])
+
+        if self.evictor is not None:
+            self.evictor.inserted(len(items), sum(
+                len(key) + len(canonical_key or '') + len(value) for (_, key), (value, canonical_key) in items
+            ))
+
+    def scan(self) -> typing.Iterator[tuple[Namespace, Key, Row]]:
+        for namespace, key, value, canonical_key in self.connection.execute(self.statements.scan):
+            yield namespace, key, (value, canonical_key)
+
+    def set_version(self, version: str) -> None:
+        self.connection.execute(self.statements.create_versions_table)
+
+        with transaction(self.connection, self.transaction_lock):
+            match self.connection.execute(self.statements.get_version, (self.table_name,)).fetchall():
+                case [[stored_version]] if stored_version == version:
+                    return
+            self.connection.execute(self.statements.purge)
+            self.connection.execute(self.statements.set_version, (self.table_name, version))
+
+
+@dataclasses.dataclass(kw_only=True)
+class DBMBackend(Backend):
+    """Stores rows in the `dbm` database at `path`, using whichever `dbm` implementation is available.
+
+    Lookups avoid SQL parsing and are cheap, but most `dbm` implementations are unsafe to write from several processes
+    at once, so this suits caches owned by one process. The database is closed by `close` or at exit.
+    """
+    path: pathlib.Path | str
+
+    db: typing.Any = dataclasses.field(init=False)
+    lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+
+    version_key: typing.ClassVar[bytes] = b'\x00version'
+
+    def __post_init__(self) -> None:
+        self.db = dbm.open(str(self.path), 'c')
+        atexit.register(self.close)
+
+    def close(self) -> None:
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+
+    def delete(self, namespace: Namespace, key: Key) -> None:
+        with self.lock:
+            self.db.pop(dumps_item((namespace, key)), None)
+
+    def get(self, namespace: Namespace, key: Key) -> Row | None:
+        with self.lock:
+            if (row := self.db.get(dumps_item((namespace, key)))) is None:
+                return None
+
+        return marshal.loads(row)
+
+    def get_many(self, namespace: Namespace, keys: typing.Iterable[Key]) -> dict[Key, Row]:
+        return {key: row for key in keys if (row := self.get(namespace, key)) is not None}
+
+    def purge(self) -> None:
+        with self.lock:
+            for db_key in [*self.db.keys()]:
+                if db_key != self.version_key:
+                    del self.db[db_key]
+
+    def put(self, namespace: Namespace, key: Key, row: Row) -> None:
+        self.put_many([((namespace, key), row)])
+
+    def put_many(self, items: typing.Iterable[tuple[tuple[Namespace, Key], Row]]) -> None:
+        with self.lock:
+            for item, row in items:
+                self.db[dumps_item(item)] = dumps_item(row)
+
+    def scan(self) -> typing.Iterator[tuple[Namespace, Key, Row]]:
+        with self.lock:
+            db_keys = [*self.db.keys()]
+        for db_key in db_keys:
+            if db_key != self.version_key and (row := self.db.get(db_key)) is not None:
+                namespace, key = marshal.loads(db_key)
+                yield namespace, key, marshal.loads(row)
+
+    def set_version(self, version: str) -> None:
+        with self.lock:
+            if self.db.get(self.version_key) == version.encode():
+                return
+        self.purge()
+        with self.lock:
+            self.db[self.version_key] = version.encode()
+
+
+@dataclasses.dataclass(kw_only=True)
+class FilesystemBackend(Backend):
+    """Stores each row in its own file under `directory`.
+
+    Files are named by a digest of their namespace and key and sharded into subdirectories named by the first
+    `shard_width` hex digits of the digest, keeping directories small. Rows are written to a temporary file and renamed
+    into place, so concurrent readers in any process see either the old or the new row, never a partial one.
+    """
+    directory: pathlib.Path | str
+    shard_width: typing.Annotated[int, annotated_types.Interval[int](ge=1, le=4)] = 2
+
+    def __post_init__(self) -> None:
+        self.directory = pathlib.Path(self.directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, namespace: Namespace, key: Key) -> pathlib.Path:
+        digest = hashlib.blake2b(dumps_item((namespace, key)), digest_size=16).hexdigest()
+        return self.directory / digest[:self.shard_width] / digest[self.shard_width:]
+
+    def delete(self, namespace: Namespace, key: Key) -> None:
+        self._path(namespace, key).unlink(missing_ok=True)
+
+    def get(self, namespace: Namespace, key: Key) -> Row | None:
+        try:
+            stored_namespace, stored_key, value, canonical_key = marshal.loads(self._path(namespace, key).read_bytes())
+        except FileNotFoundError:
+            return None
+
+        if (stored_namespace, stored_key) != (namespace, key):
+            return None
+
+        return value, canonical_key
+
+    def get_many(self, namespace: Namespace, keys: typing.Iterable[Key]) -> dict[Key, Row]:
+        return {key: row for key in keys if (row := self.get(namespace, key)) is not None}
+
+    def purge(self) -> None:
+        for shard in self.directory.iterdir():
+            if shard.is_dir():
+                shutil.rmtree(shard, ignore_errors=True)
+
+    def put(self, namespace: Namespace, key: Key, row: Row) -> None:
+        value, canonical_key = row
+        write_file(self._path(namespace, key), dumps_item((namespace, key, value, canonical_key)))
+
+    def put_many(self, items: typing.Iterable[tuple[tuple[Namespace, Key], Row]]) -> None:
+        for (namespace, key), row in items:
+            self.put(namespace, key, row)
+
+    def scan(self) -> typing.Iterator[tuple[Namespace, Key, Row]]:
+        for shard in self.directory.iterdir():
+            if not shard.is_dir():
+                continue
+            for path in shard.iterdir():
+                if path.name.startswith('.'):
+                    continue
+                try:
+                    namespace, key, value, canonical_key = marshal.loads(path.read_bytes())
+                except FileNotFoundError:
+                    continue
+                yield namespace, key, (value, canonical_key)
+
+    def set_version(self, version: str) -> None:
+        path = self.directory / '.version'
+        try:
+            if path.read_text() == version:
+                return
+        except FileNotFoundError:
+            ...
+        self.purge()
+        write_file(path, version.encode())
+
+
+@dataclasses.dataclass(kw_only=True)
+class ShardedBackend(LeaseBackend):
+    """Spreads rows across `backends` by a hash of their namespace and key.
+
+    With one SQLite database file per shard, misses on different shards are written concurrently instead of queueing on
+    the one writer lock of a single file. Adding or removing shards moves most keys to a different shard, so changing
+    their number cold-starts the cache. Leases are forwarded to the shard of their key, which must be a `LeaseBackend`
+    for them to be used.
+    """
+    backends: typing.Sequence[Backend]
+
+    def shard(self, namespace: Namespace, key: Key) -> Backend:
+        """Returns the backend that stores `key` of `namespace`."""
+        digest = hashlib.blake2b(dumps_item((namespace, key)), digest_size=8).digest()
+        return self.backends[int.from_bytes(digest) % len(self.backends)]
+
+    def acquire_lease(self, namespace: Namespace, key: Key, duration: float) -> bool:
+        return self.shard(namespace, key).acquire_lease(namespace, key, duration)
+
+    def delete(self, namespace: Namespace, key: Key) -> None:
+        self.shard(namespace, key).delete(namespace, key)
+
+    def get(self, namespace: Namespace, key: Key) -> Row | None:
+        return self.shard(namespace, key).get(namespace, key)
+
+    def get_many(self, namespace: Namespace, keys: typing.Iterable[Key]) -> dict[Key, Row]:
+        keys_by_backend: dict[int, tuple[Backend, list[Key]]] = {}
+        for key in keys:
+            backend = self.shard(namespace, key)
+            keys_by_backend.setdefault(id(backend), (backend, []))[1].append(key)
+
+        rows = {}
+        for backend, keys in keys_by_backend.values():
+            rows |= backend.get_many(namespace, keys)
+
+        return rows
+
+    def purge(self) -> None:
+        for backend in self.backends:
+            backend.purge()
+
+    def put(self, namespace: Namespace, key: Key, row: Row) -> None:
+        self.shard(namespace, key).put(namespace, key, row)
+
+    def put_many(self, items: typing.Iterable[tuple[tuple[Namespace, Key], Row]]) -> None:
+        items_by_backend: dict[int, tuple[Backend, list[tuple[tuple[Namespace, Key], Row]]]] = {}
+        for item, row in items:
+            backend = self.shard(*item)
+            items_by_backend.setdefault(id(backend), (backend, []))[1].append((item, row))
+
+        for backend, items in items_by_backend.values():
+            backend.put_many(items)
+
+    def release_lease(self, namespace: Namespace, key: Key) -> None:
+        self.shard(namespace, key).release_lease(namespace, key)
+
+    def scan(self) -> typing.Iterator[tuple[Namespace, Key, Row]]:
+        for backend in self.backends:
+            yield from backend.scan()
+
+    def set_version(self, version: str) -> None:
+        for backend in self.backends:
+            backend.set_version(version)
+
+
+@dataclasses.dataclass(kw_only=True)
+class BlobBackend(LeaseBackend):
+    """Stores `bytes` values longer than `threshold` in content-addressed files under `directory`, keeping only a
+    reference to the file in `backend`.
+
+    Blob files are named by a blake2b digest of their content, sharded by its first two hex digits, and written with an
+    atomic rename, so concurrent readers never see a partial file and equal values share one file. Reads map the file
+    into memory and return a read-only `memoryview` of it, so a hit costs no copy until `loads_value` reads it.
+
+    Deleting, evicting, expiring or overwriting a row leaves its blob in place, since other rows may share it. `collect`
+    removes blobs that no row references and runs after every `collect_every` blobs written. If `max_bytes` is set, it
+    also runs whenever blob files exceed it and then removes least recently written blobs until they fit, so rows that
+    referenced them read as misses. Leases are forwarded to `backend`, which must be a `LeaseBackend` for them to be
+    used.
+    """
+    backend: Backend
+    directory: pathlib.Path | str
+    threshold: typing.Annotated[int, annotated_types.Ge(0)] = 1 << 20
+    max_bytes: typing.Annotated[int, annotated_types.Ge(0)] | None = None
+    collect_every: typing.Annotated[int, annotated_types.Gt(0)] = 64
+
+    # Held while writing blobs and the rows that reference them, so `collect` never lists a blob before its row exists.
+    lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+    # Bytes of blob files, counted when `collect` lists them and added to as blobs are written.
+    total_bytes: int = dataclasses.field(init=False)
+    writes: int = 0
+
+    # Stored in place of a value whose blob is named by the hex digest that follows it. Values that start with this are
+    #  always stored as blobs so that they are never mistaken for a reference.
+    reference_prefix: typing.ClassVar[bytes] = b'\x00funktools.blob\x00'
+
+    def __post_init__(self) -> None:
+        self.directory = pathlib.Path(self.directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.total_bytes = sum(stat.st_size for stat in self._list(self.directory).values())
+
+    @staticmethod
+    def _list(directory: pathlib.Path) -> dict[pathlib.Path, os.stat_result]:
+        blobs = {}
+        for path in directory.glob('*/*'):
+            if not path.name.startswith('.'):
+                with contextlib.suppress(FileNotFoundError):
+                    blobs[path] = path.stat()
+
+        return blobs
+
+    @staticmethod
+    def _path(directory: pathlib.Path, digest: str) -> pathlib.Path:
+        return directory / digest[:2] / digest[2:]
+
+    @classmethod
+    def _select(
+        cls,
+        directory: pathlib.Path,
+        blobs: dict[pathlib.Path, os.stat_result],
+        values: typing.Iterable[Value],
+        max_bytes: int | None,
+    ) -> dict[pathlib.Path, os.stat_result]:
+        referenced = {}
+        for value in values:
+            if isinstance(value, bytes) and value.startswith(cls.reference_prefix):
+                path = cls._path(directory, value[len(cls.reference_prefix):].decode())
+                if path in blobs:
+                    referenced[path] = blobs[path]
+
+        selected = {path: stat for path, stat in blobs.items() if path not in referenced}
+        if max_bytes is not None:
+            total_bytes = sum(stat.st_size for stat in referenced.values())
+            for path, stat in sorted(referenced.items(), key=lambda item: item[1].st_mtime_ns):
+                if total_bytes <= max_bytes:
+                    break
+                selected[path] = stat
+                total_bytes -= stat.st_size
+
+        return selected
+
+    @staticmethod
+    def _unlink(blobs: dict[pathlib.Path, os.stat_result]) -> int:
+        removed = 0
+        for path, stat in blobs.items():
+            # A blob written or shared again since it was listed may be referenced by a row that was not yet read.
+            with contextlib.suppress(FileNotFoundError):
+                if path.stat().st_mtime_ns == stat.st_mtime_ns:
+                    path.unlink()
+                    removed += stat.st_size
+
+        return removed
+
+    @classmethod
+    def collect_directory(
+        cls,
+        directory: pathlib.Path | str,
+        values: typing.Iterable[Value],
+        max_bytes: int | None = None,
+    ) -> int:
+        """Removes blobs under `directory` that none of `values` references, then least recently written blobs until at
+        most `max_bytes` remain. Returns the number of bytes removed.
+        """
+        directory = pathlib.Path(directory)
+        return cls._unlink(cls._select(directory, cls._list(directory), values, max_bytes))
+
+    def _dumps_row(self, row: Row) -> Row:
+        value, canonical_key = row
+        if not isinstance(value, bytes | memoryview) or (
+            len(value) <= self.threshold and bytes(value[:len(self.reference_prefix)]) != self.reference_prefix
+        ):
+            return row
+
+        digest = hashlib.blake2b(value, digest_size=32).hexdigest()
+        path = self._path(self.directory, digest)
+        try:
+            # Marks a shared blob as recently written, so bounding `max_bytes` keeps it.
+            os.utime(path)
+        except FileNotFoundError:
+            write_file(path, value)
+            self.total_bytes += len(value)
+            self.writes += 1
+
+        return self.reference_prefix + digest.encode(), canonical_key
+
+    def _loads_row(self, row: Row) -> Row | None:
+        value, canonical_key = row
+        if not isinstance(value, bytes) or not value.startswith(self.reference_prefix):
+            return row
+
+        try:
+            with open(self._path(self.directory, value[len(self.reference_prefix):].decode()), 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return memoryview(b''), canonical_key
+                return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)), canonical_key
+        except FileNotFoundError:
+            return None
+
+    def _try_collect(self) -> None:
+        with self.lock:
+            if self.writes < self.collect_every and (self.max_bytes is None or self.total_bytes <= self.max_bytes):
+                return
+        self.collect()
+
+    def acquire_lease(self, namespace: Namespace, key: Key, duration: float) -> bool:
+        return self.backend.acquire_lease(namespace, key, duration)
+
+    def collect(self) -> None:
+        """Removes blobs that no row references, then least recently written blobs while over `max_bytes`."""
+        with self.lock:
+            blobs = self._list(self.directory)
+            self.total_bytes = sum(stat.st_size for stat in blobs.values())
+            self.writes = 0
+        selected = self._select(
+            self.directory, blobs, (value for _, _, (value, _) in self.backend.scan()), self.max_bytes,
+        )
+        with self.lock:
+            self.total_bytes -= self._unlink(selected)
+
+    def delete(self, namespace: Namespace, key: Key) -> None:
+        self.backend.delete(namespace, key)
+
+    def get(self, namespace: Namespace, key: Key) -> Row | None:
+        if (row := self.backend.get(namespace, key)) is None:
+            return None
+
+        return self._loads_row(row)
+
+    def get_many(self, namespace: Namespace, keys: typing.Iterable[Key]) -> dict[Key, Row]:
+        return {
+            key: row for key, stored_row in self.backend.get_many(namespace, keys).items()
+            if (row := self._loads_row(stored_row)) is not None
+        }
+
+    def purge(self) -> None:
+        self.backend.purge()
+        for shard in self.directory.iterdir():
+            if shard.is_dir():
+                shutil.rmtree(shard, ignore_errors=True)
+
+    def put(self, namespace: Namespace, key: Key, row: Row) -> None:
+        with self.lock:
+            self.backend.put(namespace, key, self._dumps_row(row))
+        self._try_collect()
+
+    def put_many(self, items: typing.Iterable[tuple[tuple[Namespace, Key], Row]]) -> None:
+        with self.lock:
+            self.backend.put_many([(item, self._dumps_row(row)) for item, row in items])
+        self._try_collect()
+
+    def release_lease(self, namespace: Namespace, key: Key) -> None:
+        self.backend.release_lease(namespace, key)
+
+    def scan(self) -> typing.Iterator[tuple[Namespace, Key, Row]]:
+        for namespace, key, row in self.backend.scan():
+            if (row := self._loads_row(row)) is not None:
+                yield namespace, key, row
+
+    def set_version(self, version: str) -> None:
+        self.backend.set_version(version)
@@ -12,6 +12,7 @@ import types
 import typing
 import weakref
 
+type ArgSet = tuple[tuple[typing.Any, ...], dict[str, typing.Any]]
 type Instance = object
 type Name = typing.Annotated[str, annotated_types.Predicate(str.isidentifier)]  # noqa
 
@@ -58,6 +59,9 @@ class ContextBase[** Params, Return](
     instance: Instance | None = None
     instance_lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
 
+    def norm_args(self, args: Params.args) -> Params.args:
+        return args if self.instance is None else (self.instance, *args)
+
     @property
     @abc.abstractmethod
     def async_context_t(self) -> type[AsyncContext[Params, Return]]: ...
@@ -374,6 +378,18 @@ class Decorated[** Params, Return](abc.ABC):
     @abc.abstractmethod
     def __call__(self): ...
 
+    def __getattr__(self, name: str) -> typing.Any:
+        # Public methods of enter contexts (e.g. `cache_get_many`) are reachable through the decorated function. The
+        #  outermost enter context that defines the method handles it.
+        if not name.startswith('_'):
+            enter_context = self.__dict__.get('enter_context')
+            while isinstance(enter_context, EnterContextBase):
+                if callable(getattr(type(enter_context), name, None)):
+                    return getattr(enter_context, name)
+                enter_context = enter_context.next_enter_context
+
+        raise AttributeError(f'{type(self).__name__!r} object has no attribute {name!r}')
+
     def __get__(self, instance: Instance, owner) -> Decorated[Params, Return]:
         with self.instance_lock:
             if (decorated := self.decorated_by_instance.get(instance)) is None:
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
 import abc
+import annotated_types
 import asyncio
+import atexit
 import collections
 import concurrent.futures
 import dataclasses
+import os
+import pathlib
+import pickle
 import sys
+import tempfile
 import threading
+import time
 import typing
 
 from . import _base
@@ -16,6 +23,16 @@ type Expire = float
 type Key = typing.Hashable
 type GenerateKey[** Params] = typing.Callable[Params, Key]
 
+SNAPSHOT_HEADER = ('funktools.LRUCache', 1)
+
+
+@dataclasses.dataclass(kw_only=True)
+class Snapshot:
+    """Snapshot file of a cache. It is read on first use of the cache and rewritten periodically and at exit."""
+    interval: typing.Annotated[float, annotated_types.Gt(0.0)] | None
+    loaded: bool = False
+    path: pathlib.Path
+
 
 @dataclasses.dataclass(frozen=True, kw_only=True)
 class EnterContext[** Params, Return](
@@ -26,7 +43,9 @@ class EnterContext[** Params, Return](
         default_factory=collections.OrderedDict
     )
     generate_key: GenerateKey[Params]
+    save_exceptions: bool
     size: int
+    snapshot: Snapshot | None = None
 
     @abc.abstractmethod
     def __call__(
@@ -38,16 +57,134 @@ class EnterContext[** Params, Return](
         | asyncio.Future[Return]
         | concurrent.futures.Future[Return]
     ):
+        self._load_snapshot()
         key = self.generate_key(*args, **kwargs)
         while self.size < len(self.exit_context_by_key):
             self.exit_context_by_key.popitem(last=False)
-        if (exit_context := self.exit_context_by_key.pop(key, None)) is None:
+        if (exit_context := self.exit_context_by_key.pop(key, None)) is None or (
+            not self.save_exceptions and exit_context.future.done() and exit_context.future.exception() is not None
+        ):
             exit_context = self.exit_context_by_key[key] = self.exit_context_t()
             return exit_context, self.next_enter_context
 
         self.exit_context_by_key[key] = exit_context
         return exit_context.future
 
+    def cache_get_many(self, arg_sets: typing.Iterable[_base.ArgSet], default: typing.Any = None) -> list[Return]:
+        """Returns cached results for each of `arg_sets`, or `default` for those not cached.
+
+        Arg sets missing here are looked up in the next cache tier, if it supports `cache_get_many`, and results found
+        there are kept in this cache.
+        """
+        self._load_snapshot()
+        arg_sets = [*arg_sets]
+        keys = [self.generate_key(*self.norm_args(args), **kwargs) for args, kwargs in arg_sets]
+        missing = object()
+        results = []
+        for key in keys:
+            exit_context = self.exit_context_by_key.get(key)
+            if exit_context is None or not exit_context.future.done() or exit_context.future.exception() is not None:
+                results.append(missing)
+            else:
+                self.exit_context_by_key.move_to_end(key)
+                results.append(exit_context.future.result())
+
+        if (
+            (misses := [i for i, result in enumerate(results) if result is missing])
+            and (cache_get_many := getattr(self.next_enter_context, 'cache_get_many', None)) is not None
+        ):
+            for i, result in zip(misses, cache_get_many([arg_sets[i] for i in misses], default=missing)):
+                if result is not missing:
+                    self.exit_context_by_key[keys[i]] = self._completed(result)
+                    results[i] = result
+            while self.size < len(self.exit_context_by_key):
+                self.exit_context_by_key.popitem(last=False)
+
+        return [default if result is missing else result for result in results]
+
+    def cache_prefetch(self, arg_sets: typing.Iterable[_base.ArgSet]) -> None:
+        """Loads results for each of `arg_sets` from the next cache tier into this cache."""
+        self.cache_get_many(arg_sets)
+
+    def _completed(self, result: Return) -> ExitContext[Params, Return]:
+        """Returns an exit context already holding `result`.
+
+        Its future is a `concurrent.futures.Future` even for async callees, since an `asyncio.Future` needs an event
+        loop and results may be loaded before one is running.
+        """
+        future = concurrent.futures.Future()
+        future.set_result(result)
+
+        return self.exit_context_t(future=future)
+
+    def _dump(self, path: pathlib.Path | str) -> None:
+        items = [
+            (key, exit_context.future.result())
+            for key, exit_context in [*self.exit_context_by_key.items()]
+            if exit_context.future.done() and exit_context.future.exception() is None
+        ]
+
+        path = pathlib.Path(path)
+        with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f'.{path.name}.', delete=False) as f:
+            try:
+                pickler = pickle.Pickler(f)
+                pickler.dump(SNAPSHOT_HEADER)
+                for item in items:
+                    pickler.dump(item)
+                    pickler.clear_memo()
+            except BaseException:
+                os.unlink(f.name)
+                raise
+        os.replace(f.name, path)
+
+    def _load(self, path: pathlib.Path | str) -> None:
+        with open(path, 'rb') as f:
+            unpickler = pickle.Unpickler(f)
+            if (header := unpickler.load()) != SNAPSHOT_HEADER:
+                raise ValueError(f'{path=!s} is not a snapshot. Expected header {SNAPSHOT_HEADER!r}, got {header!r}.')
+            exit_context_by_key = collections.OrderedDict()
+            while True:
+                try:
+                    key, result = unpickler.load()
+                except EOFError:
+                    break
+                exit_context_by_key[key] = self._completed(result)
+
+        # Results already in the cache are newer than the snapshot, so they stay and remain most recently used.
+        for key in self.exit_context_by_key.keys() & exit_context_by_key.keys():
+            del exit_context_by_key[key]
+        exit_context_by_key.update(self.exit_context_by_key)
+        self.exit_context_by_key.clear()
+        self.exit_context_by_key.update(exit_context_by_key)
+        while self.size < len(self.exit_context_by_key):
+            self.exit_context_by_key.popitem(last=False)
+
+    def _load_snapshot(self) -> None:
+        if self.snapshot is not None and not self.snapshot.loaded:
+            self.snapshot.loaded = True
+            if self.snapshot.path.exists():
+                self._load(self.snapshot.path)
+
+    def cache_dump(self, path: pathlib.Path | str) -> None:
+        """Atomically writes completed results to `path`, least recently used first.
+
+        The file is a stream of pickles, one per result, so it is written and read without holding the whole cache in
+        memory twice.
+        """
+        self._dump(path)
+
+    def cache_load(self, path: pathlib.Path | str) -> None:
+        """Adds results written by `cache_dump` to `path`, keeping their recency order.
+
+        Results are unpickled, so only load files written by a trusted process.
+        """
+        self._load(path)
+
+    def cache_save_snapshot(self) -> None:
+        """Writes the snapshot file if the cache has been used since it was read."""
+        if self.snapshot is not None and self.snapshot.loaded:
+            self.cache_dump(self.snapshot.path)
+
     def __get__(self, instance: _base.Instance, owner) -> EnterContext[Params, Return]:
         with self.instance_lock:
             if (enter_context := self.enter_context_by_instance.get(instance)) is None:
@@ -56,6 +193,7 @@ class EnterContext[** Params, Return](
                     next_enter_context=self.next_enter_context.__get__(instance, owner),
                     exit_context_by_key=collections.OrderedDict(),
                     instance=instance,
+                    snapshot=None,
                 )
             return enter_context
 
@@ -94,6 +232,9 @@ class AsyncEnterContext[** Params, Return](
         # FIXME: what if someone explicitly returns a Future from their own code? We don't want to await it.
         if isinstance(result, asyncio.Future):
             result = await result
+        elif isinstance(result, concurrent.futures.Future):
+            # Completed results kept without an event loop, see `_completed`.
+            result = result.result()
 
         return result
 
@@ -118,13 +259,27 @@ class MultiEnterContext[** Params, Return](
 
         return result
 
+    def cache_get_many(self, arg_sets: typing.Iterable[_base.ArgSet], default: typing.Any = None) -> list[Return]:
+        with self.lock:
+            return super().cache_get_many(arg_sets, default)
+
+    def cache_dump(self, path: pathlib.Path | str) -> None:
+        with self.lock:
+            self._load_snapshot()
+            super().cache_dump(path)
+
+    def cache_load(self, path: pathlib.Path | str) -> None:
+        with self.lock:
+            self._load_snapshot()
+            super().cache_load(path)
+
 
 @dataclasses.dataclass(frozen=True, kw_only=True)
 class AsyncExitContext[** Params, Return](
     ExitContext[Params, Return],
     _base.AsyncExitContext[Params, Return],
 ):
-    future: asyncio.Future = dataclasses.field(default_factory=asyncio.Future)
+    future: asyncio.Future | concurrent.futures.Future = dataclasses.field(default_factory=asyncio.Future)
 
     async def __call__(self, result: _base.Raise | Return) -> Return:
         return super().__call__(result)
@@ -147,6 +302,15 @@ class Decorator[** Params, Return](
 ):
     size: int = sys.maxsize
     generate_key: GenerateKey[Params] = lambda *args, **kwargs: (tuple(args), tuple(sorted([*kwargs.items()])))
+    # If False, a call that raised is evicted on the next lookup of its key so the callee is called again. Waiters
+    #  already joined on the raising call still see the exception.
+    save_exceptions: bool = True
+
+    # If set, completed results are written to `snapshot_path` at exit and every `snapshot_interval` seconds, and read
+    #  back the first time the cache is used, so a restarted process starts warm. Snapshots are pickles, so only point
+    #  this at files written by a trusted process.
+    snapshot_path: pathlib.Path | str | None = None
+    snapshot_interval: typing.Annotated[float, annotated_types.Gt(0.0)] | None = None
 
     register: typing.ClassVar[_base.Register] = _base.Register()
 
@@ -164,13 +328,28 @@ class Decorator[** Params, Return](
                 enter_context_t = MultiEnterContext
             case _: assert False, 'Unreachable'  # pragma: no cover
 
-        decorated = self.register.decorateds[decoratee.register_key] = dataclasses.replace(
-            decoratee,
-            enter_context=enter_context_t(
-                generate_key=self.generate_key,
-                next_enter_context=decoratee.enter_context,
-                size=self.size,
+        enter_context = enter_context_t(
+            generate_key=self.generate_key,
+            next_enter_context=decoratee.enter_context,
+            save_exceptions=self.save_exceptions,
+            size=self.size,
+            snapshot=None if self.snapshot_path is None else Snapshot(
+                interval=self.snapshot_interval, path=pathlib.Path(self.snapshot_path),
             ),
         )
 
+        if enter_context.snapshot is not None:
+            atexit.register(enter_context.cache_save_snapshot)
+            if enter_context.snapshot.interval is not None:
+                def save_snapshots() -> None:
+                    while True:
+                        time.sleep(enter_context.snapshot.interval)
+                        enter_context.cache_save_snapshot()
+
+                threading.Thread(target=save_snapshots, daemon=True).start()
+
+        decorated = self.register.decorateds[decoratee.register_key] = dataclasses.replace(
+            decoratee, enter_context=enter_context,
+        )
+
         return decorated
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import io
+import math
+
+import numpy
+import numpy.lib.format
+import numpy.typing
+
+
+def dumps_array(array: numpy.typing.ArrayLike) -> bytes:
+    """Returns `array` in `.npy` format, a short header followed by the raw array buffer.
+
+    Arrays of Python objects are refused rather than pickled.
+    """
+    with io.BytesIO() as f:
+        numpy.lib.format.write_array(f, numpy.asanyarray(array), allow_pickle=False)
+        return f.getvalue()
+
+
+def loads_array(value: bytes | memoryview) -> numpy.ndarray:
+    """Returns a read-only array over the `.npy` formatted `value` without copying its buffer.
+
+    Paired with a `memoryview` of a mapped file (see `BlobBackend`), this serves an array straight from the page cache,
+    as `numpy.load(..., mmap_mode='r')` would.
+    """
+    value = memoryview(value)
+    if bytes(value[:6]) != numpy.lib.format.MAGIC_PREFIX:
+        raise ValueError(f'Expected .npy format, got {bytes(value[:6])!r}.')
+
+    match value[6]:
+        case 1:
+            read_array_header, length_size = numpy.lib.format.read_array_header_1_0, 2
+        case 2:
+            read_array_header, length_size = numpy.lib.format.read_array_header_2_0, 4
+        case _:
+            # Version 3 only differs by UTF-8 field names, which are rare enough to not be worth a zero-copy path.
+            with io.BytesIO(value) as f:
+                return numpy.load(f, allow_pickle=False)
+
+    offset = 8 + length_size + int.from_bytes(value[8:8 + length_size], 'little')
+    with io.BytesIO(value[8:offset]) as f:
+        shape, fortran_order, dtype = read_array_header(f)
+
+    array = numpy.frombuffer(value, dtype=dtype, count=math.prod(shape), offset=offset)
+
+    return array.reshape(shape, order='F' if fortran_order else 'C')
@@ -4,73 +4,230 @@ import abc
 import annotated_types
 import ast
 import asyncio
+import atexit
 import collections
 import dataclasses
+import hashlib
 import pathlib
-import textwrap
 import threading
+import time
+import types
 import typing
 
-import sqlite3
-
+from . import _backend
 from . import _base
-
-type Key = str
+from . import _lru_cache
+from ._backend import CanonicalKey, Key, Namespace
 
 type LoadsValue[Return] = typing.Callable[[bytes], Return]
-type DumpsKey[** Params] = typing.Callable[Params, Key]
+type DumpsKey[** Params] = typing.Callable[Params, CanonicalKey]
+type DumpsNamespace = typing.Callable[[_base.Instance], Namespace]
 type DumpsValue[Return] = typing.Callable[[Return], bytes]
 
 
+def _canonical(value: object) -> bytes:
+    """Returns `repr` of `value` as bytes, except that set elements are sorted, within containers too, so that the
+    result does not depend on `PYTHONHASHSEED`."""
+    match value:
+        case set() | frozenset():
+            items = sorted(_canonical(item) for item in value)
+        case tuple() | list():
+            items = [_canonical(item) for item in value]
+        case dict():
+            items = [_canonical(key) + b': ' + _canonical(item) for key, item in value.items()]
+        case _:
+            return repr(value).encode()
+
+    return type(value).__name__.encode() + b'(' + b', '.join(items) + b')'
+
+
+def fingerprint(function: types.FunctionType) -> str:
+    """Returns a digest of `function`'s bytecode, constants, referenced names and defaults.
+
+    Nested functions and comprehensions are included. Line numbers and file names are not, so moving a function without
+    changing it keeps its fingerprint. Constants and defaults are included by `repr`, with set elements sorted so that
+    the fingerprint is the same in every process.
+    """
+    hash_ = hashlib.blake2b(digest_size=16)
+
+    def update(code: types.CodeType) -> None:
+        hash_.update(code.co_code)
+        hash_.update(repr(code.co_names).encode())
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                update(const)
+            else:
+                hash_.update(_canonical(const))
+
+    update(function.__code__)
+    hash_.update(_canonical((function.__defaults__, function.__kwdefaults__)))
+
+    return hash_.hexdigest()
+
+
+class Leased:
+    """Returned by a lookup that missed while another process holds the lease to compute its key."""
+
+
+@dataclasses.dataclass(kw_only=True)
+class WriteBehind:
+    """Buffers inserts in memory and flushes them to the backend in batches.
+
+    Pending values are visible to lookups as soon as they are put. A daemon thread flushes once `size` values are
+    pending or `interval` seconds have passed. Writers that find `max_pending` values already queued flush inline,
+    pushing back on callers that outpace the flusher. Anything still pending at interpreter exit is flushed.
+    """
+    backend: _backend.Backend
+    interval: typing.Annotated[float, annotated_types.Gt(0.0)]
+    max_pending: typing.Annotated[int, annotated_types.Gt(0)]
+    size: typing.Annotated[int, annotated_types.Gt(0)]
+
+    condition: threading.Condition = dataclasses.field(default_factory=threading.Condition)
+    pending: dict[tuple[Namespace, Key], _backend.Row] = dataclasses.field(default_factory=dict)
+    thread: threading.Thread | None = None
+
+    def __post_init__(self) -> None:
+        atexit.register(self.flush)
+
+    def _run(self) -> None:
+        try:
+            while True:
+                with self.condition:
+                    self.condition.wait_for(lambda: len(self.pending) >= self.size, timeout=self.interval)
+                self.flush()
+        finally:
+            with self.condition:
+                self.thread = None
+
+    def flush(self) -> None:
+        with self.condition:
+            pending = dict(self.pending)
+        if not pending:
+            return
+
+        self.backend.put_many(pending.items())
+
+        with self.condition:
+            for item, row in pending.items():
+                if self.pending.get(item) is row:
+                    del self.pending[item]
+
+    def get(self, namespace: Namespace, key: Key) -> _backend.Row | None:
+        with self.condition:
+            return self.pending.get((namespace, key))
+
+    def put(self, namespace: Namespace, key: Key, row: _backend.Row) -> None:
+        with self.condition:
+            self.pending[(namespace, key)] = row
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+            if len(self.pending) >= self.size:
+                self.condition.notify()
+            if len(self.pending) < self.max_pending:
+                return
+
+        self.flush()
+
+
 @dataclasses.dataclass(frozen=True, kw_only=True)
 class EnterContext[** Params, Return](
     _base.EnterContext[Params, Return],
     abc.ABC,
 ):
-    connection: sqlite3.Connection
+    backend: _backend.Backend
+    digest_size: typing.Annotated[int, annotated_types.Interval[int](ge=1, le=64)] | None
     dumps_key: DumpsKey[Params]
+    dumps_namespace: DumpsNamespace
     dumps_value: DumpsValue[Return]
-    exit_context_by_key: collections.OrderedDict[Key, ExitContext[Params, Return]]
+    exit_context_by_key: collections.OrderedDict[CanonicalKey, ExitContext[Params, Return]]
+    lease_duration: typing.Annotated[float, annotated_types.Gt(0.0)] | None
+    lease_poll_interval: typing.Annotated[float, annotated_types.Gt(0.0)]
+    lease_poll_max_interval: typing.Annotated[float, annotated_types.Gt(0.0)]
     loads_value: LoadsValue[Return]
-    table_name: str
-
-    def __post_init__(
-        self: AsyncEnterContext[Params, Return] | MultiEnterContext[Params, Return],
-    ) -> None:
-        self.connection.execute(textwrap.dedent(f'''
-            CREATE TABLE IF NOT EXISTS `{self.table_name}` (
-                key STRING PRIMARY KEY NOT NULL UNIQUE,
-                value STRING NOT NULL
-            )
-        ''').strip())
+    namespace: Namespace = ''
+    verify_key: bool
+    write_behind: WriteBehind | None
 
     def __call__(
         self: AsyncEnterContext[Params, Return] | MultiEnterContext[Params, Return],
-        key: Key,
+        canonical_key: CanonicalKey,
     ):
-        match self.connection.execute(
-            f'SELECT value FROM `{self.table_name}` WHERE key = ?', (key,)
-        ).fetchall():
-            case [[value]]:
-                return ast.literal_eval(value)
-        exit_context = self.exit_context_by_key[key] = self.exit_context_t(
-            connection=self.connection,
+        key, row_canonical_key = self.dumps_row_key(canonical_key)
+
+        if self.write_behind is not None and (row := self.write_behind.get(self.namespace, key)) is not None:
+            value, stored_canonical_key = row
+            if stored_canonical_key == row_canonical_key:
+                return self.loads_value(value)
+
+        match self.backend.get(self.namespace, key):
+            case (value, stored_canonical_key) if stored_canonical_key == row_canonical_key:
+                return self.loads_value(value)
+
+        if self.lease_duration is not None and not self.backend.acquire_lease(self.namespace, key, self.lease_duration):
+            return Leased()
+
+        exit_context = self.exit_context_by_key[canonical_key] = self.exit_context_t(
+            backend=self.backend,
+            canonical_key=row_canonical_key,
             dumps_value=self.dumps_value,
             key=key,
-            table_name=self.table_name,
+            leased=self.lease_duration is not None,
+            namespace=self.namespace,
+            write_behind=self.write_behind,
         )
 
         return exit_context, self.next_enter_context
 
+    def cache_get_many(self, arg_sets: typing.Iterable[_base.ArgSet], default: typing.Any = None) -> list[Return]:
+        """Returns cached results for each of `arg_sets`, or `default` for those not cached.
+
+        Keys not pending a write-behind flush are looked up with one `Backend.get_many` call.
+        """
+        row_keys = [
+            self.dumps_row_key(self.dumps_key(*self.norm_args(args), **kwargs)) for args, kwargs in arg_sets
+        ]
+
+        rows: dict[Key, _backend.Row] = {}
+        if self.write_behind is not None:
+            for key, _ in row_keys:
+                if (row := self.write_behind.get(self.namespace, key)) is not None:
+                    rows[key] = row
+
+        rows |= self.backend.get_many(self.namespace, {key for key, _ in row_keys if key not in rows})
+
+        results = []
+        for key, row_canonical_key in row_keys:
+            match rows.get(key):
+                case (value, stored_canonical_key) if stored_canonical_key == row_canonical_key:
+                    results.append(self.loads_value(value))
+                case _:
+                    results.append(default)
+
+        return results
+
+    def cache_prefetch(self, arg_sets: typing.Iterable[_base.ArgSet]) -> None:
+        """Looks up each of `arg_sets` in bulk. Only useful to populate a cache tier in front of this one."""
+        self.cache_get_many(arg_sets)
+
+    def dumps_row_key(self, canonical_key: CanonicalKey) -> tuple[Key, CanonicalKey | None]:
+        """Returns the primary key and the canonical key column stored for `canonical_key`."""
+        if self.digest_size is None:
+            return canonical_key, None
+
+        return (
+            hashlib.blake2b(canonical_key.encode(), digest_size=self.digest_size).digest(),
+            canonical_key if self.verify_key else None,
+        )
+
     def __get__(self, instance, owner):
         with self.instance_lock:
             if (enter_context := self.enter_context_by_instance.get(instance)) is None:
                 enter_context = self.enter_context_by_instance[instance] = dataclasses.replace(
                     self,
-                    connection=self.connection,
                     instance=instance,
+                    namespace=self.dumps_namespace(instance),
                     next_enter_context=self.next_enter_context.__get__(instance, owner),
-                    table_name=f'{self.table_name}__{instance}',
                 )
             return enter_context
 
@@ -80,10 +237,13 @@ class ExitContext[** Params, Return](
     _base.ExitContext[Params, Return],
     abc.ABC,
 ):
-    connection: sqlite3.Connection
+    backend: _backend.Backend
+    canonical_key: CanonicalKey | None
     dumps_value: DumpsValue[Return]
     key: Key
-    table_name: str
+    leased: bool
+    namespace: Namespace
+    write_behind: WriteBehind | None
 
     @abc.abstractmethod
     def __call__(
@@ -93,12 +253,15 @@ class ExitContext[** Params, Return](
 
         try:
             if isinstance(result, _base.Raise):
-                raise result.e
+                if self.leased:
+                    self.backend.release_lease(self.namespace, self.key)
+                raise result.exc_val
+            elif self.write_behind is not None:
+                # The lease is released by the flush that makes the value visible to other processes.
+                self.write_behind.put(self.namespace, self.key, (self.dumps_value(result), self.canonical_key))
+                return result
             else:
-                self.connection.execute(
-                    f'''INSERT INTO `{self.table_name}` (key, value) VALUES (?, ?)''',
-                    (self.key, self.dumps_value(result))
-                )
+                self.backend.put(self.namespace, self.key, (self.dumps_value(result), self.canonical_key))
                 return result
         finally:
             self.event.set()
@@ -129,7 +292,16 @@ class AsyncEnterContext[** Params, Return](
                     await self.lock.acquire()
                 self.exit_context_by_key.pop(key, None)
 
-            return super().__call__(key)
+            delay = self.lease_poll_interval
+            while isinstance(result := super().__call__(key), Leased):
+                self.lock.release()
+                try:
+                    await asyncio.sleep(delay)
+                finally:
+                    await self.lock.acquire()
+                delay = min(delay * 2, self.lease_poll_max_interval)
+
+            return result
 
 
 @dataclasses.dataclass(frozen=True, kw_only=True)
@@ -161,7 +333,16 @@ class MultiEnterContext[** Params, Return](
                     self.lock.acquire()
                 self.exit_context_by_key.pop(key, None)
 
-            return super().__call__(key)
+            delay = self.lease_poll_interval
+            while isinstance(result := super().__call__(key), Leased):
+                self.lock.release()
+                try:
+                    time.sleep(delay)
+                finally:
+                    self.lock.acquire()
+                delay = min(delay * 2, self.lease_poll_max_interval)
+
+            return result
 
 
 @dataclasses.dataclass(frozen=True, kw_only=True)
@@ -188,12 +369,80 @@ class MultiExitContext[** Params, Return](
 
 @dataclasses.dataclass(frozen=True, kw_only=True)
 class Decorator[** Params, Return](_base.Decorator[Params, Return]):
+    # Where rows are stored. By default, a `SQLiteBackend` table named after the decorated function in `db_path`, using
+    #  the eviction and `get_many_chunk_size` options below. A given backend is used as is and those options are
+    #  ignored. It stores the rows of one decorated function, so give each function its own backend.
+    backend: _backend.Backend | None = None
     db_path: pathlib.Path | str = 'file::memory:?cache=shared'
+    # If greater than 1, rows are spread by key hash across this many database files, `db_path` and then `db_path`
+    #  suffixed by `.1`, `.2` and so on, so that misses on different shards do not queue on one SQLite writer lock.
+    #  `max_bytes` and `max_rows` are divided evenly between shards (see `ShardedBackend`).
+    shards: typing.Annotated[int, annotated_types.Gt(0)] = 1
     dumps_key: DumpsKey = ...
+    # Maps the instance or class a method is bound to onto the namespace its results are stored under. Results of all
+    #  instances share one table keyed by `(namespace, key)`, so this should be stable across processes if the table is
+    #  meant to be shared or to outlive the process.
+    dumps_namespace: DumpsNamespace = str
     dumps_value: DumpsValue[Return] = repr
+    # If set, `bytes` values longer than `blob_threshold` are stored in content-addressed files under a subdirectory of
+    #  `blob_directory` named after the decorated function and read back as a read-only `memoryview` of the mapped file
+    #  (see `BlobBackend`). `loads_value` must accept a `memoryview`, e.g. `pickle.loads` paired with `pickle.dumps`.
+    #  Blobs no row references are removed every `blob_collect_every` blobs written, and `max_bytes` also bounds the
+    #  bytes of blob files, least recently written first.
+    blob_directory: pathlib.Path | str | None = None
+    blob_threshold: typing.Annotated[int, annotated_types.Ge(0)] = 1 << 20
+    blob_collect_every: typing.Annotated[int, annotated_types.Gt(0)] = 64
+    # If set, rows are keyed by a blake2b digest of this many bytes of the canonical key from `dumps_key` instead of the
+    #  canonical key itself, keeping the primary key index small for large arguments. With `verify_key`, the canonical
+    #  key is also kept in a side column and a row whose canonical key differs is treated as a miss.
+    digest_size: typing.Annotated[int, annotated_types.Interval[int](ge=1, le=64)] | None = None
+    verify_key: bool = False
     duration: typing.Annotated[float, annotated_types.Ge(0.0)] | None = None
     loads_value: LoadsValue[Return] = ast.literal_eval
 
+    # Rows stored under a different version are dropped when the function is decorated, so a deploy only cold-starts
+    #  caches of functions that changed. `version` is compared as given. If `fingerprint` is True, a digest of the
+    #  decorated function's code, constants and defaults (see `fingerprint`) is used as well.
+    version: str | None = None
+    fingerprint: bool = False
+
+    # `cache_get_many` and `cache_prefetch` look up at most this many keys per query.
+    get_many_chunk_size: typing.Annotated[int, annotated_types.Gt(0)] = 512
+    # Compiled statements kept by each connection (see `SQLiteBackend`).
+    cached_statements: typing.Annotated[int, annotated_types.Ge(0)] = 128
+
+    # If set, an in-process LRUCache of this size is placed in front of the backend. Lookups read through it to the
+    #  backend and results are written through to both, so hot keys are served without a lookup while the backend still
+    #  persists across restarts and is shared between processes. Exceptions are not kept in memory.
+    l1_size: typing.Annotated[int, annotated_types.Gt(0)] | None = None
+
+    # If either bound is set, least recently accessed rows are evicted so that the table holds no more than `max_rows`
+    #  rows and `max_bytes` bytes of keys and values. Bounds are enforced every `evict_every` inserts. Access times are
+    #  recorded for a `touch_sample` fraction of hits and written in batches of `touch_size`.
+    max_bytes: typing.Annotated[int, annotated_types.Ge(0)] | None = None
+    max_rows: typing.Annotated[int, annotated_types.Ge(0)] | None = None
+    evict_every: typing.Annotated[int, annotated_types.Gt(0)] = 64
+    touch_sample: typing.Annotated[float, annotated_types.Interval[float](ge=0.0, le=1.0)] = 0.1
+    touch_size: typing.Annotated[int, annotated_types.Gt(0)] = 64
+
+    # If set, a miss first takes a lease on its key in a lease table shared by every process using `db_path` (or from
+    #  the given `LeaseBackend`). Processes that miss while another holds an unexpired lease poll for the value instead
+    #  of computing it, starting at `lease_poll_interval` seconds and doubling up to `lease_poll_max_interval`. Leases
+    #  expire after `lease_duration` seconds so that keys held by crashed processes are reclaimed, so it should exceed
+    #  the expected computation time.
+    lease_duration: typing.Annotated[float, annotated_types.Gt(0.0)] | None = None
+    lease_poll_interval: typing.Annotated[float, annotated_types.Gt(0.0)] = 0.01
+    lease_poll_max_interval: typing.Annotated[float, annotated_types.Gt(0.0)] = 1.0
+
+    # If True, results are buffered in memory and written with `Backend.put_many` by a background thread instead of
+    #  one insert per miss. A flush happens once `flush_size` results are pending or every `flush_interval`
+    #  seconds. Callers that find `max_pending` results already queued flush inline, which bounds memory when misses
+    #  outpace the flusher. By default, `max_pending` is four times `flush_size`.
+    write_behind: bool = False
+    flush_interval: typing.Annotated[float, annotated_types.Gt(0.0)] = 1.0
+    flush_size: typing.Annotated[int, annotated_types.Gt(0)] = 1024
+    max_pending: typing.Annotated[int, annotated_types.Gt(0)] | None = None
+
     def __call__(
         self,
         decoratee: _base.Decoratee[Params, Return] | _base.Decorated[Params, Return],
@@ -202,10 +451,10 @@ class Decorator[** Params, Return](_base.Decorator[Params, Return]):
         decoratee = super().__call__(decoratee)
 
         if (dumps_key := self.dumps_key) is ...:
-            def dumps_key(*args, **kwargs) -> Key:
+            def dumps_key(*args, **kwargs) -> CanonicalKey:
                 bound = decoratee.signature.bind(*args, **kwargs)
                 bound.apply_defaults()
-                return repr((bound.args, tuple(sorted(bound.kwargs))))
+                return repr((bound.args, tuple(sorted(bound.kwargs.items()))))
 
         match decoratee:
             case _base.AsyncDecorated():
@@ -214,16 +463,70 @@ class Decorator[** Params, Return](_base.Decorator[Params, Return]):
                 enter_context_t = MultiEnterContext
             case _: assert False, 'Unreachable'  # pragma: no cover
 
+        if (backend := self.backend) is None:
+            backends = [
+                _backend.SQLiteBackend(
+                    cached_statements=self.cached_statements,
+                    db_path=self.db_path if shard == 0 else f'{self.db_path}.{shard}',
+                    evict_every=self.evict_every,
+                    get_many_chunk_size=self.get_many_chunk_size,
+                    leases=self.lease_duration is not None,
+                    max_bytes=None if self.max_bytes is None else -(-self.max_bytes // self.shards),
+                    max_rows=None if self.max_rows is None else -(-self.max_rows // self.shards),
+                    table_name='__'.join(decoratee.register_key),
+                    touch_sample=self.touch_sample,
+                    touch_size=self.touch_size,
+                )
+                for shard in range(self.shards)
+            ]
+            backend = backends[0] if self.shards == 1 else _backend.ShardedBackend(backends=backends)
+        if self.lease_duration is not None and not isinstance(backend, _backend.LeaseBackend):
+            raise TypeError(f'{self.lease_duration=} requires a LeaseBackend, got {backend=}.')
+        if self.blob_directory is not None:
+            backend = _backend.BlobBackend(
+                backend=backend,
+                directory=pathlib.Path(self.blob_directory, '__'.join(decoratee.register_key)),
+                threshold=self.blob_threshold,
+                max_bytes=self.max_bytes,
+                collect_every=self.blob_collect_every,
+            )
+
+        if self.version is not None or self.fingerprint:
+            enter_context = decoratee.enter_context
+            while not isinstance(enter_context, _base.Base):
+                enter_context = enter_context.next_enter_context
+            backend.set_version(':'.join(filter(None, [
+                self.version, fingerprint(enter_context.decoratee) if self.fingerprint else None,
+            ])))
+
         decorated = self.register.decorateds[decoratee.register_key] = dataclasses.replace(
             decoratee,
             enter_context=enter_context_t(
-                connection=sqlite3.connect(self.db_path, isolation_level=None),
+                backend=backend,
+                digest_size=self.digest_size,
                 dumps_key=dumps_key,
+                dumps_namespace=self.dumps_namespace,
                 dumps_value=self.dumps_value,
+                lease_duration=self.lease_duration,
+                lease_poll_interval=self.lease_poll_interval,
+                lease_poll_max_interval=self.lease_poll_max_interval,
                 loads_value=self.loads_value,
                 next_enter_context=decoratee.enter_context,
-                table_name='__'.join(decoratee.register_key),
+                verify_key=self.verify_key,
+                write_behind=WriteBehind(
+                    backend=backend,
+                    interval=self.flush_interval,
+                    max_pending=4 * self.flush_size if self.max_pending is None else self.max_pending,
+                    size=self.flush_size,
+                ) if self.write_behind else None,
             ),
         )
 
+        if self.l1_size is not None:
+            decorated = self.register.decorateds[decoratee.register_key] = _lru_cache.Decorator(
+                generate_key=dumps_key,
+                save_exceptions=False,
+                size=self.l1_size,
+            )(decorated)
+
         return decorated
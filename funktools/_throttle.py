@@ -3,8 +3,18 @@ from __future__ import annotations
 import abc
 import annotated_types
 import asyncio
+import bisect
+import collections
+import concurrent.futures
+import contextlib
+import contextvars
 import dataclasses
 import heapq
+import itertools
+import math
+import os
+import pathlib
+import sqlite3
 import sys
 import threading
 import time
@@ -13,10 +23,18 @@ import typing
 from . import _base
 
 
-type Condition = asyncio.Condition | threading.Condition
 type Lock = asyncio.Lock | threading.Lock
 type Penalty = typing.Annotated[float, annotated_types.Gt(0.0)]
 type Time = typing.Annotated[float, annotated_types.Gt(0.0)]
+type Algorithm = typing.Literal['aimd', 'gradient', 'vegas']
+type Key = typing.Hashable
+type GenerateKey[** Params] = typing.Callable[Params, Key]
+type Cost = typing.Annotated[int, annotated_types.Ge(0)]
+type GenerateCost[** Params] = typing.Callable[Params, Cost]
+type Priority = float
+type GeneratePriority[** Params] = typing.Callable[Params, Priority]
+type Backoff = typing.Callable[[BaseException], float | None]
+type Congestion = typing.Callable[[BaseException], bool]
 
 
 class Pane:
@@ -24,6 +42,224 @@ class Pane:
     size: typing.Annotated[int, annotated_types.Gt(0)] = sys.maxsize
 
 
+@dataclasses.dataclass(eq=False, kw_only=True)
+class Waiter:
+    """A call being admitted, queued whenever it has to wait."""
+    # When the call arrived, on the `time.monotonic` clock.
+    arrival: float
+    cost: Cost
+    # Time on the `time.monotonic` clock by which the call must be admitted, if any.
+    deadline: float | None = None
+    # Resolves True once the waiter is admitted, or False if it is woken to wait out the next pane instead.
+    future: asyncio.Future[bool] | concurrent.futures.Future[bool] | None = None
+    # Order in which waiters are served, lowest first. See `AIMDSemaphore`.
+    rank: float
+
+
+@dataclasses.dataclass(frozen=True, kw_only=True)
+class Snapshot:
+    """State of a throttle at `time`, with counts since it was created."""
+    admitted: int
+    holders: int
+    limit: int
+    mean_latency: float
+    rejected: int
+    time: float
+    value: int
+    waiters: int
+    # Number of admitted calls by how long they waited, each counted in the first bucket of `wait_bounds` that is not
+    #  less than its wait in seconds.
+    waits: tuple[int, ...]
+
+    wait_bounds: typing.ClassVar[tuple[float, ...]] = (
+        0.0, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0, math.inf
+    )
+
+
+@dataclasses.dataclass(kw_only=True)
+class Queue:
+    """Waiters in order of rank, then of arrival."""
+    heap: list[tuple[float, int, Waiter]] = dataclasses.field(default_factory=list)
+    sequence: typing.Iterator[int] = dataclasses.field(default_factory=itertools.count)
+
+    def __bool__(self) -> bool:
+        return bool(self.heap)
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    @property
+    def head(self) -> Waiter:
+        return self.heap[0][2]
+
+    def pop(self) -> Waiter:
+        return heapq.heappop(self.heap)[2]
+
+    def push(self, waiter: Waiter, *, first: bool = False) -> None:
+        heapq.heappush(self.heap, (-math.inf if first else waiter.rank, next(self.sequence), waiter))
+
+    def cost_before(self, rank: float) -> Cost:
+        """Returns the total cost of waiters that would be served before a waiter of `rank`."""
+        return sum(waiter.cost for waiter_rank, _, waiter in self.heap if waiter_rank <= rank)
+
+    def remove(self, waiter: Waiter) -> None:
+        self.heap = [entry for entry in self.heap if entry[2] is not waiter]
+        heapq.heapify(self.heap)
+
+
+def _fits(used: int, cost: Cost, limit: int) -> bool:
+    return used == 0 or used + cost <= limit
+
+
+@dataclasses.dataclass(kw_only=True)
+class Shared:
+    """Holders and window admissions of a throttle, kept in a SQLite file shared by every process on the host.
+
+    Each process keeps one row of how many units it holds under `name`, so `max_holders` is enforced across processes.
+    Rows of processes that exited without releasing are dropped once the holder limit is reached and their pid no
+    longer exists. Admissions are kept as rows of their time and cost for `window` seconds, so `per_window` is enforced
+    as a sliding window across processes.
+
+    Processes do not notify each other of releases. A caller that finds the host full polls every `poll` seconds, or
+    sleeps until the oldest admission of the window expires. Connections give up on a database locked by another
+    process after `poll` seconds and try again after another `poll` seconds, rather than raising.
+    """
+    db_path: pathlib.Path | str
+    max_holders: int
+    name: str
+    per_window: int
+    poll: typing.Annotated[float, annotated_types.Gt(0.0)] = .01
+    window: typing.Annotated[float, annotated_types.Ge(0.0)]
+
+    # Connection and lock are shared by copies made for other keys of the same throttle. A forked process reconnects.
+    connection: sqlite3.Connection | None = None
+    lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+    pid: int | None = None
+
+    def __post_init__(self) -> None:
+        if self.connection is None:
+            self._connect()
+
+    def _connect(self) -> None:
+        self.connection = sqlite3.connect(
+            self.db_path, check_same_thread=False, isolation_level=None, timeout=self.poll
+        )
+        self.pid = os.getpid()
+        self._retry(self._create_tables)
+
+    def _create_tables(self) -> None:
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS `__funktools_throttle_holders__` ('
+            ' name TEXT NOT NULL, pid INTEGER NOT NULL, holders INTEGER NOT NULL, PRIMARY KEY (name, pid)'
+            ')'
+        )
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS `__funktools_throttle_admissions__` ('
+            ' name TEXT NOT NULL, time REAL NOT NULL, cost INTEGER NOT NULL'
+            ')'
+        )
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS `__funktools_throttle_admissions__name_time`'
+            ' ON `__funktools_throttle_admissions__` (name, time)'
+        )
+
+    def _retry[T](self, f: typing.Callable[..., T], *args) -> T:
+        """Calls `f` with `args` until SQLite no longer gives up on a lock held by another connection, sleeping `poll`
+        seconds between tries."""
+        while True:
+            try:
+                return f(*args)
+            except sqlite3.OperationalError as exception:
+                if 'database is locked' not in str(exception):
+                    raise
+            time.sleep(self.poll)
+
+    def _reap(self) -> bool:
+        """Drops holder rows of processes that no longer exist and returns whether any were dropped."""
+        dead = []
+        for pid, in self.connection.execute(
+            'SELECT pid FROM `__funktools_throttle_holders__` WHERE name = ? AND holders > 0', (self.name,)
+        ).fetchall():
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                dead.append((self.name, pid))
+            except PermissionError:
+                ...
+        self.connection.executemany(
+            'DELETE FROM `__funktools_throttle_holders__` WHERE name = ? AND pid = ?', dead
+        )
+
+        return bool(dead)
+
+    def _holders(self) -> int:
+        holders, = self.connection.execute(
+            'SELECT IFNULL(SUM(holders), 0) FROM `__funktools_throttle_holders__` WHERE name = ?', (self.name,)
+        ).fetchone()
+
+        return holders
+
+    def _try_acquire(self, cost: Cost) -> float:
+        if not _fits(self._holders(), cost, self.max_holders) and not (
+            self._reap() and _fits(self._holders(), cost, self.max_holders)
+        ):
+            return self.poll
+
+        now = time.time()
+        if self.per_window != sys.maxsize:
+            self.connection.execute(
+                'DELETE FROM `__funktools_throttle_admissions__` WHERE name = ? AND time <= ?',
+                (self.name, now - self.window),
+            )
+            admitted, oldest = self.connection.execute(
+                'SELECT IFNULL(SUM(cost), 0), MIN(time) FROM `__funktools_throttle_admissions__` WHERE name = ?',
+                (self.name,),
+            ).fetchone()
+            if not _fits(admitted, cost, self.per_window):
+                return max(self.poll, oldest + self.window - now)
+            self.connection.execute(
+                'INSERT INTO `__funktools_throttle_admissions__` (name, time, cost) VALUES (?, ?, ?)',
+                (self.name, now, cost),
+            )
+
+        self.connection.execute(
+            'INSERT INTO `__funktools_throttle_holders__` (name, pid, holders) VALUES (?, ?, ?)'
+            ' ON CONFLICT (name, pid) DO UPDATE SET holders = holders + excluded.holders',
+            (self.name, self.pid, cost),
+        )
+
+        return 0.0
+
+    def acquire(self, cost: Cost) -> float:
+        """Admits a call costing `cost` if limits across processes allow and returns 0.0, or else returns how long to
+        wait before trying again."""
+        with self.lock:
+            if self.pid != os.getpid():
+                self._connect()
+            return self._retry(self._transact, cost)
+
+    def _transact(self, cost: Cost) -> float:
+        # Immediate, so that concurrent acquirers serialize here rather than fail to upgrade a read lock.
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            delay = self._try_acquire(cost)
+            self.connection.execute('COMMIT')
+        except BaseException:
+            if self.connection.in_transaction:
+                self.connection.execute('ROLLBACK')
+            raise
+
+        return delay
+
+    def release(self, cost: Cost) -> None:
+        with self.lock:
+            self._retry(
+                self.connection.execute,
+                'UPDATE `__funktools_throttle_holders__` SET holders = holders - ? WHERE name = ? AND pid = ?',
+                (cost, self.name, self.pid),
+            )
+
+
 # TODO: All of AIMDSemaphore belongs inside appropriate Async/Multi/Enter/Exit Contexts.
 @dataclasses.dataclass(kw_only=True)
 class AIMDSemaphore(abc.ABC):
@@ -42,8 +278,43 @@ class AIMDSemaphore(abc.ABC):
         - Value increases by 1 if a holder releases without raising an exception and the number of holders is greater
           than half of value.
 
-    'checkpoint' behavior:
-        -
+    'algorithm' behavior:
+        - aimd - Value grows additively while holders succeed, as above.
+        - gradient - Value is scaled by the ratio of `min_latency` to the latency of each successful call, clamped to
+          [.5, 1], plus the square root of value as allowance for queueing. The result is smoothed into `estimate`.
+        - vegas - The number of calls queued upstream is estimated as `value * (1 - min_latency / latency)`. Value grows
+          while the estimate is small and shrinks while it is large, each by the log of value.
+        - `min_latency` drops to any lower latency at once, but moves `min_latency_aging` of the way toward each higher
+          latency, so that the baseline follows upstream to a new normal rather than holding value down for good.
+        - Value only grows while at least half of it is held, so idle periods don't inflate it.
+        - Regardless of algorithm, value is cut in half each time a holder raises, unless `congestion` returns False
+          for the exception, in which case value is left as is.
+
+    'metrics' behavior:
+        - Admitted and rejected calls are counted, and admitted calls are counted by how long they waited. `snapshot`
+          returns the counts along with the current holders, waiters, and limit.
+        - With `sample_interval`, a snapshot is appended to `samples` on admission or rejection, at most once per
+          `sample_interval` seconds. Only the last `max_samples` are kept, so a throttle that sees no calls records
+          nothing new.
+
+    'backoff' behavior:
+        - If `backoff_from` returns a number of seconds for an exception, no caller is admitted until that many seconds
+          have passed. Callers admitted meanwhile hold their place and sleep out the remainder.
+
+    'wait' behavior:
+        - Waiters are queued in order of priority, lowest first, then of arrival. Callers never pass a non-empty queue.
+        - A caller with a deadline is rejected upfront if its estimated wait would pass the deadline, and rejected once
+          the deadline passes if it is still waiting. The wait for a hold is estimated from the cost queued ahead, the
+          limit, and `mean_latency`. Waits for `rate`, panes, and the backoff of value are known exactly.
+        - With `aging`, a waiter's priority drops by 1 for each `aging` seconds it has waited, so low priority waiters
+          are eventually served ahead of newer high priority ones. Waiters are ranked by `priority + arrival / aging`.
+        - A freed hold or pane slot is handed directly to the first waiter, which wakes already admitted. Waiters are
+          woken once, not woken to compete for what was freed.
+
+    'cost' behavior:
+        - A call costing N units counts as N holders, N calls of its pane and window, and N calls under `rate`.
+        - The first waiter blocks those behind it until its cost fits, so large calls are not starved by small ones.
+        - A call costing more than a whole limit is admitted alone once nothing else is held.
 
     Value
     """
@@ -59,165 +330,453 @@ class AIMDSemaphore(abc.ABC):
     per_window: int
     window: typing.Annotated[float, annotated_types.Ge(0.0)]
 
+    aging: typing.Annotated[float, annotated_types.Gt(0.0)] | None = None
+    algorithm: Algorithm = 'aimd'
+    backoff_from: Backoff | None = None
+    burst: typing.Annotated[int, annotated_types.Gt(0)] = 1
+    congestion: Congestion | None = None
+    max_samples: typing.Annotated[int, annotated_types.Gt(0)] = 1024
+    rate: typing.Annotated[float, annotated_types.Gt(0.0)] | None = None
+    sample_interval: typing.Annotated[float, annotated_types.Gt(0.0)] | None = None
+    shared: Shared | None = None
+
+    admitted: int = 0
+    next_sample: float = 0.0
+    rejected: int = 0
+    samples: collections.deque[Snapshot] = dataclasses.field(init=False)
+    waits: list[int] = dataclasses.field(default_factory=lambda: [0] * len(Snapshot.wait_bounds))
+
+    # Value before truncation, so that `gradient` can accumulate changes of less than 1.
+    estimate: float = 0.0
     holders: int = 0
-    holders_this_pane: int = 0
-    panes: list[float] = dataclasses.field(default_factory=list)
+    holders_queue: Queue = dataclasses.field(default_factory=Queue)
+    # Units admitted in panes that have not yet expired.
+    holders_this_window: int = 0
+    # Moving average of call latency.
+    mean_latency: float = 0.0
+    # Latency of a successful call that is not queued upstream, taken as the lowest latency recently seen.
+    min_latency: float = math.inf
+    # The pane currently admitting callers, as an entry of `panes`.
+    pane: list[float] | None = None
+    # Heap of [expiry on the `time.time` clock, units admitted] for each pane that has not yet expired.
+    panes: list[list[float]] = dataclasses.field(default_factory=list)
+    panes_queue: Queue = dataclasses.field(default_factory=Queue)
+    # Time on the `time.monotonic` clock until which admission is paused by `backoff_from`.
+    paused_until: float = 0.0
+    # Calls between looking up the semaphore by key and returning from `acquire`, which keep it from being dropped.
+    pinned: int = 0
+    # Theoretical arrival time of the next call under `rate`, per the generic cell rate algorithm (GCRA).
+    tat: float = 0.0
     waiters: int = 0
 
     pane_pending: bool = False
 
-    holders_condition_t: typing.ClassVar[type[asyncio.Condition] | type[threading.Condition]]
-    holders_condition: holders_condition_t = ...
-
-    panes_condition_t: typing.ClassVar[type[asyncio.Condition] | type[threading.Condition]]
-    panes_condition: panes_condition_t = ...
+    min_latency_aging: typing.ClassVar[float] = .01
+    smoothing: typing.ClassVar[float] = .2
 
     exception_t: typing.ClassVar[type[Exception]] = type('Exception', (Exception,), {})
     sleep_t: typing.ClassVar[type[asyncio.sleep] | type[time.sleep]]
 
     def __post_init__(self) -> None:
-        self.holders_this_pane = self.per_pane
+        self.estimate = self.value
+        self.samples = collections.deque(maxlen=self.max_samples)
+
+    @property
+    def idle(self) -> bool:
+        """Whether the semaphore has no pinned callers, holders, waiters, or window, rate, or backoff state still in
+        effect."""
+        return (
+            not self.pinned
+            and not self.holders
+            and not self.waiters
+            and self.paused_until <= (now := time.monotonic())
+            and self.tat <= now
+            and not any(units and expiry >= time.time() for expiry, units in self.panes)
+        )
+
+    @property
+    def limit(self) -> int:
+        """How many units may be held at once."""
+        return max(1, min(self.value, self.max_holders))
+
+    def _hand_off_holders(self) -> None:
+        """Hands free holds to waiters at the head of `holders_queue`."""
+        while self.holders_queue and _fits(self.holders, self.holders_queue.head.cost, self.limit):
+            if not (waiter := self.holders_queue.pop()).future.cancelled():
+                self.holders += waiter.cost
+                waiter.future.set_result(True)
+
+    def _pane_fits(self, cost: Cost) -> bool:
+        """Whether `cost` more units fit in both the current pane and the window."""
+        return (
+            self.pane is not None
+            and _fits(self.pane[1], cost, self.per_pane)
+            and _fits(self.holders_this_window, cost, self.per_window)
+        )
+
+    def _admit_pane(self, cost: Cost) -> None:
+        self.pane[1] += cost
+        self.holders_this_window += cost
+
+    def _open_pane(self, now: float) -> None:
+        self.pane = [now + self.window, 0]
+        heapq.heappush(self.panes, self.pane)
+
+    def _expire_pane(self) -> None:
+        """Drops the oldest pane, returning its units to the window."""
+        pane = heapq.heappop(self.panes)
+        self.holders_this_window -= pane[1]
+        if pane is self.pane:
+            self.pane = None
+
+    def _hand_off_panes(self) -> None:
+        """Hands free slots of the current pane to waiters at the head of `panes_queue`.
+
+        If waiters remain once the pane is full and nobody is waiting out the next pane, the first of them is woken
+        unadmitted to do so.
+        """
+        while self.panes_queue and self._pane_fits(self.panes_queue.head.cost):
+            if not (waiter := self.panes_queue.pop()).future.cancelled():
+                self._admit_pane(waiter.cost)
+                waiter.future.set_result(True)
+        while self.panes_queue and not self.pane_pending:
+            if not (waiter := self.panes_queue.pop()).future.cancelled():
+                waiter.future.set_result(False)
+                break
+
+    def _record(self, wait: float | None) -> None:
+        """Counts an admission after `wait` seconds, or a rejection if `wait` is None."""
+        if wait is None:
+            self.rejected += 1
+        else:
+            self.admitted += 1
+            self.waits[bisect.bisect_left(Snapshot.wait_bounds, wait)] += 1
+
+        if self.sample_interval is not None and (now := time.monotonic()) >= self.next_sample:
+            self.next_sample = now + self.sample_interval
+            self.samples.append(self.snapshot())
+
+    def _reject(self, message: str) -> Exception:
+        self._record(None)
+        return self.exception_t(message)
+
+    def snapshot(self) -> Snapshot:
+        return Snapshot(
+            admitted=self.admitted,
+            holders=self.holders,
+            limit=self.limit,
+            mean_latency=self.mean_latency,
+            rejected=self.rejected,
+            time=time.time(),
+            value=self.value,
+            waiters=self.waiters,
+            waits=tuple(self.waits),
+        )
+
+    def _pause(self) -> float:
+        """Returns how long admission remains paused by `backoff_from`."""
+        return self.paused_until and self.paused_until - time.monotonic()
+
+    def _check_wait(self, waiter: Waiter, delay: float) -> None:
+        """Rejects `waiter` if it would still be waiting `delay` seconds from now past its deadline."""
+        if waiter.deadline is not None and time.monotonic() + delay > waiter.deadline:
+            raise self._reject(f'Waiting {delay=} would pass {waiter.deadline=}.')
 
-    def _release(self, ok: bool) -> None:
-        match ok:
-            case True if self.value <= 0:
+    def _estimate_wait(self, waiter: Waiter) -> float:
+        if waiter.deadline is None:
+            return 0.0
+        return (self.holders_queue.cost_before(waiter.rank) + waiter.cost) / self.limit * self.mean_latency
+
+    def _rank(self, priority: Priority) -> float:
+        return priority if self.aging is None else priority + time.monotonic() / self.aging
+
+    def _release_hold(self, cost: Cost) -> None:
+        self.holders -= cost
+        self._hand_off_holders()
+
+    def _reserve(self, waiter: Waiter) -> float:
+        """Reserves the next admission under `rate` and returns how long the caller must sleep before it."""
+        now = time.monotonic()
+        tat = max(self.tat, now) + waiter.cost / self.rate
+        self._check_wait(waiter, delay := tat - now - self.burst / self.rate)
+        self.tat = tat
+
+        return delay
+
+    def _age_min_latency(self, latency: float) -> None:
+        if latency < self.min_latency:
+            self.min_latency = latency
+        else:
+            self.min_latency += (latency - self.min_latency) * self.min_latency_aging
+
+    def _adapt(self, ok: bool, latency: float) -> None:
+        match ok, self.algorithm:
+            case True, _ if self.value <= 0:
                 self.value = 1
-            case True if self.additive_increase and (
+            case True, 'aimd' if self.additive_increase and (
                 self.holders > self.value - int(self.value * self.multiplicative_decrease)
             ):
                 self.value += self.additive_increase
-                self.holders_condition.notify(self.additive_increase)
-            case False if self.value > 0:
+            case True, 'gradient':
+                self._age_min_latency(latency)
+                gradient = max(.5, min(1.0, self.min_latency / latency)) if latency > 0.0 else 1.0
+                estimate = self.estimate * gradient + math.sqrt(self.estimate)
+                if self.holders * 2 < self.value:
+                    estimate = min(estimate, self.estimate)
+                self.estimate = min(
+                    float(self.max_holders), self.estimate * (1 - self.smoothing) + estimate * self.smoothing
+                )
+                self.value = max(1, int(self.estimate))
+            case True, 'vegas':
+                self._age_min_latency(latency)
+                queued = self.value * (1 - self.min_latency / latency) if latency > 0.0 else 0.0
+                log = math.log10(max(2, self.value))
+                if queued <= 3 * log and self.holders * 2 >= self.value:
+                    self.value = min(self.max_holders, self.value + max(1, int(log)))
+                elif queued >= 6 * log:
+                    self.value = max(1, self.value - max(1, int(log)))
+            case False, _ if self.value > 0:
                 self.value //= 2
-            case False:
+            case False, _:
                 self.value -= 1
 
-        self.holders -= 1
-        self.holders_condition.notify(1)
+        if self.algorithm != 'gradient' or not ok:
+            self.estimate = self.value
+
+    def _release(self, latency: float, cost: Cost, exception: BaseException | None) -> None:
+        self.mean_latency += (latency - self.mean_latency) * self.smoothing
+        if exception is not None and self.backoff_from is not None and (
+            (backoff := self.backoff_from(exception)) is not None
+        ):
+            self.paused_until = max(self.paused_until, time.monotonic() + backoff)
+        if exception is None or self.congestion is None or self.congestion(exception):
+            self._adapt(exception is None, latency)
+
+        self._release_hold(cost)
+
+    def _withdraw(self, queue: Queue, waiter: Waiter) -> None:
+        """Removes a waiter that stopped waiting, passing on whatever was handed to it in the meantime."""
+        if waiter.future.cancel() or waiter.future.cancelled():
+            queue.remove(waiter)
+        elif queue is self.holders_queue:
+            self._release_hold(waiter.cost)
+        else:
+            # Units admitted to a pane stay spent, since the pane they were counted against may have expired since.
+            self._hand_off_panes()
 
 
 @dataclasses.dataclass(kw_only=True)
 class AsyncAIMDSemaphore(AIMDSemaphore):
-    holders_condition_t: typing.ClassVar[type[asyncio.Condition]] = asyncio.Condition
-    panes_condition_t: typing.ClassVar[type[asyncio.Condition]] = asyncio.Condition
 
-    holders_condition: asyncio.Condition = dataclasses.field(default_factory=holders_condition_t)
-    panes_condition: asyncio.Condition = dataclasses.field(default_factory=panes_condition_t)
-
-    @staticmethod
-    async def _sleep(condition: asyncio.Condition, delay: float) -> None:
-        condition.release()
-        try:
-            await asyncio.sleep(delay)
-        finally:
-            await condition.acquire()
-
-    async def _wait(self, condition: asyncio.Condition) -> None:
+    async def _wait(self, queue: Queue, waiter: Waiter, *, first: bool = False) -> bool:
+        """Queues the caller and returns whether it was admitted by the time it is woken."""
         if self.waiters >= self.max_waiters:
-            raise self.exception_t(f'{self.max_waiters=} exceeded.')
+            raise self._reject(f'{self.max_waiters=} exceeded.')
 
+        waiter.future = asyncio.get_running_loop().create_future()
+        queue.push(waiter, first=first)
         self.waiters += 1
         try:
-            await condition.wait()
+            async with asyncio.timeout(None if waiter.deadline is None else waiter.deadline - time.monotonic()):
+                try:
+                    return await waiter.future
+                except asyncio.CancelledError:
+                    self._withdraw(queue, waiter)
+                    raise
+        except TimeoutError:
+            raise self._reject(f'{waiter.deadline=} passed while waiting.') from None
         finally:
             self.waiters -= 1
 
-    async def acquire(self) -> None:
-        async with self.holders_condition:
-            while self.holders >= max(1, min(self.value, self.max_holders)):
-                await self._wait(self.holders_condition)
-            self.holders += 1
+    async def _acquire_pane(self, waiter: Waiter) -> None:
+        if self.panes_queue and await self._wait(self.panes_queue, waiter):
+            return
+
+        now = None if self._pane_fits(waiter.cost) else time.time()
+        while not self._pane_fits(waiter.cost):
+            if self.pane_pending:
+                if await self._wait(self.panes_queue, waiter, first=True):
+                    return
+                now = time.time()
+            elif self.panes and self.panes[0][0] < now:
+                self._expire_pane()
+            elif _fits(self.holders_this_window, waiter.cost, self.per_window):
+                self._open_pane(now)
+            else:
+                self._check_wait(waiter, self.panes[0][0] - now)
+                self.pane_pending = True
+                try:
+                    await asyncio.sleep(self.panes[0][0] - now)
+                finally:
+                    self.pane_pending = False
+                now = max(time.time(), self.panes[0][0])
+                self._expire_pane()
+        self._admit_pane(waiter.cost)
+        self._hand_off_panes()
+
+    async def acquire(self, cost: Cost, priority: Priority, deadline: float | None) -> None:
+        waiter = Waiter(arrival=time.monotonic(), cost=cost, deadline=deadline, rank=self._rank(priority))
+        if self.holders_queue or not _fits(self.holders, waiter.cost, self.limit):
+            self._check_wait(waiter, self._estimate_wait(waiter))
+            await self._wait(self.holders_queue, waiter)
+        else:
+            self.holders += waiter.cost
+
+        try:
+            while (delay := self._pause()) > 0.0:
+                self._check_wait(waiter, delay)
+                await asyncio.sleep(delay)
 
             if self.value <= 0 and self.multiplicative_decrease:
-                await self._sleep(self.holders_condition, (1 / self.multiplicative_decrease) ** -self.value)
-
-        async with self.panes_condition:
-            while self.holders_this_pane >= self.per_pane:
-                if self.pane_pending:
-                    await self._wait(self.panes_condition)
-                elif not self.panes:
-                    self.holders_this_pane = 0
-                    heapq.heappush(self.panes, time.time() + self.window)
-                elif self.panes[0] < (now := time.time()):
-                    self.holders_this_pane = 0
-                    heapq.heappushpop(self.panes, now + self.window)
-                elif (len(self.panes) * self.per_pane) + self.holders_this_pane < self.per_window:
-                    self.holders_this_pane = 0
-                    heapq.heappush(self.panes, now + self.window)
-                else:
-                    self.pane_pending = True
-                    await self._sleep(self.panes_condition, self.panes[0] - now)
-                    self.pane_pending = False
-                    self.holders_this_pane = 0
-                    heapq.heappushpop(self.panes, self.panes[0] + self.window)
-                    self.panes_condition.notify(self.per_pane + 1)
-            self.holders_this_pane += 1
+                self._check_wait(waiter, delay := (1 / self.multiplicative_decrease) ** -self.value)
+                await asyncio.sleep(delay)
 
-    async def release(self, ok: bool) -> None:
-        async with self.holders_condition:
-            self._release(ok)
+            if self.rate is not None and (delay := self._reserve(waiter)) > 0.0:
+                await asyncio.sleep(delay)
+
+            await self._acquire_pane(waiter)
+
+            if self.shared is not None:
+                while (delay := await self._acquire_shared(waiter.cost)) > 0.0:
+                    self._check_wait(waiter, delay)
+                    await asyncio.sleep(delay)
+        except BaseException:
+            self._release_hold(waiter.cost)
+            self._hand_off_panes()
+            raise
+
+        self._record(time.monotonic() - waiter.arrival)
+
+    async def _acquire_shared(self, cost: Cost) -> float:
+        """Runs `Shared.acquire` in a thread, so that the event loop does not block on the database."""
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self.shared.acquire, cost))
+        try:
+            return await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # The attempt runs on in its thread, so whatever it admits is released once it finishes.
+            def release(future: asyncio.Future[float]) -> None:
+                if not future.cancelled() and future.exception() is None and future.result() == 0.0:
+                    asyncio.get_running_loop().run_in_executor(None, self.shared.release, cost)
+            acquiring.add_done_callback(release)
+            raise
+
+    async def release(self, latency: float, cost: Cost, exception: BaseException | None) -> None:
+        if self.shared is not None:
+            await asyncio.to_thread(self.shared.release, cost)
+        self._release(latency, cost, exception)
 
 
 @dataclasses.dataclass(kw_only=True)
 class MultiAIMDSemaphore(AIMDSemaphore):
-    holders_condition_t: typing.ClassVar[type[threading.Condition]] = threading.Condition
-    panes_condition_t: typing.ClassVar[type[threading.Condition]] = threading.Condition
+    lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+    # Counts are also recorded outside of `lock`, e.g. for rejections while sleeping.
+    stats_lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
 
-    holders_condition: threading.Condition = dataclasses.field(default_factory=holders_condition_t)
-    panes_condition: threading.Condition = dataclasses.field(default_factory=panes_condition_t)
+    def _record(self, wait: float | None) -> None:
+        with self.stats_lock:
+            super()._record(wait)
 
-    @staticmethod
-    def _sleep(condition: threading.Condition, delay: float) -> None:
-        condition.release()
+    def _sleep(self, delay: float) -> None:
+        self.lock.release()
         try:
             time.sleep(delay)
         finally:
-            condition.acquire()
+            self.lock.acquire()
 
-    def _wait(self, condition: threading.Condition) -> None:
+    def _wait(self, queue: Queue, waiter: Waiter, *, first: bool = False) -> bool:
+        """Queues the caller and returns whether it was admitted by the time it is woken."""
         if self.waiters >= self.max_waiters:
-            raise self.exception_t(f'{self.max_waiters=} exceeded.')
+            raise self._reject(f'{self.max_waiters=} exceeded.')
 
+        waiter.future = concurrent.futures.Future()
+        queue.push(waiter, first=first)
         self.waiters += 1
+        self.lock.release()
         try:
-            condition.wait()
+            concurrent.futures.wait(
+                [waiter.future], timeout=None if waiter.deadline is None else waiter.deadline - time.monotonic()
+            )
         finally:
+            self.lock.acquire()
             self.waiters -= 1
 
-    def acquire(self) -> None:
-        with self.holders_condition:
-            while self.holders >= max(1, min(self.value, self.max_holders)):
-                self._wait(self.holders_condition)
-            self.holders += 1
+        # Hand-offs happen under the lock, so a waiter that is still pending here will not be handed anything.
+        if not waiter.future.done():
+            self._withdraw(queue, waiter)
+            raise self._reject(f'{waiter.deadline=} passed while waiting.')
+
+        return waiter.future.result()
+
+    def _acquire_pane(self, waiter: Waiter) -> None:
+        if self.panes_queue and self._wait(self.panes_queue, waiter):
+            return
+
+        now = None if self._pane_fits(waiter.cost) else time.time()
+        while not self._pane_fits(waiter.cost):
+            if self.pane_pending:
+                if self._wait(self.panes_queue, waiter, first=True):
+                    return
+                now = time.time()
+            elif self.panes and self.panes[0][0] < now:
+                self._expire_pane()
+            elif _fits(self.holders_this_window, waiter.cost, self.per_window):
+                self._open_pane(now)
+            else:
+                self._check_wait(waiter, self.panes[0][0] - now)
+                self.pane_pending = True
+                try:
+                    self._sleep(self.panes[0][0] - now)
+                finally:
+                    self.pane_pending = False
+                now = max(time.time(), self.panes[0][0])
+                self._expire_pane()
+        self._admit_pane(waiter.cost)
+        self._hand_off_panes()
+
+    def acquire(self, cost: Cost, priority: Priority, deadline: float | None) -> None:
+        waiter = Waiter(arrival=time.monotonic(), cost=cost, deadline=deadline, rank=self._rank(priority))
+        with self.lock:
+            if self.holders_queue or not _fits(self.holders, waiter.cost, self.limit):
+                self._check_wait(waiter, self._estimate_wait(waiter))
+                self._wait(self.holders_queue, waiter)
+            else:
+                self.holders += waiter.cost
+
+        try:
+            while (delay := self._pause()) > 0.0:
+                self._check_wait(waiter, delay)
+                time.sleep(delay)
 
             if self.value <= 0 and self.multiplicative_decrease:
-                self._sleep(self.holders_condition, (1 / self.multiplicative_decrease) ** -self.value)
-
-        with self.panes_condition:
-            while self.holders_this_pane >= self.per_pane:
-                if self.pane_pending:
-                    self._wait(self.panes_condition)
-                elif not self.panes:
-                    self.holders_this_pane = 0
-                    heapq.heappush(self.panes, time.time() + self.window)
-                elif self.panes[0] < (now := time.time()):
-                    self.holders_this_pane = 0
-                    heapq.heappushpop(self.panes, now + self.window)
-                elif (len(self.panes) * self.per_pane) + self.holders_this_pane < self.per_window:
-                    self.holders_this_pane = 0
-                    heapq.heappush(self.panes, now + self.window)
-                else:
-                    self.pane_pending = True
-                    self._sleep(self.panes_condition, self.panes[0] - now)
-                    self.pane_pending = False
-                    self.holders_this_pane = 0
-                    heapq.heappushpop(self.panes, self.panes[0] + self.window)
-                    self.panes_condition.notify(self.per_pane + 1)
-            self.holders_this_pane += 1
+                self._check_wait(waiter, delay := (1 / self.multiplicative_decrease) ** -self.value)
+                time.sleep(delay)
+
+            if self.rate is not None:
+                with self.lock:
+                    delay = self._reserve(waiter)
+                if delay > 0.0:
+                    time.sleep(delay)
+
+            with self.lock:
+                self._acquire_pane(waiter)
+
+            if self.shared is not None:
+                while (delay := self.shared.acquire(waiter.cost)) > 0.0:
+                    self._check_wait(waiter, delay)
+                    time.sleep(delay)
+        except BaseException:
+            with self.lock:
+                self._release_hold(waiter.cost)
+                self._hand_off_panes()
+            raise
 
-    def release(self, ok: bool) -> None:
-        with self.holders_condition:
-            self._release(ok)
+        self._record(time.monotonic() - waiter.arrival)
+
+    def release(self, latency: float, cost: Cost, exception: BaseException | None) -> None:
+        if self.shared is not None:
+            self.shared.release(cost)
+        with self.lock:
+            self._release(latency, cost, exception)
 
 
 @dataclasses.dataclass(frozen=True, kw_only=True)
@@ -255,6 +814,14 @@ class EnterContext[** Params, Return](
     _base.EnterContext[Params, Return],
     abc.ABC,
 ):
+    generate_cost: GenerateCost[Params] | None = None
+    generate_key: GenerateKey[Params] | None = None
+    generate_priority: GeneratePriority[Params] | None = None
+    max_wait: float | None = None
+    max_keys: int = sys.maxsize
+    semaphore_by_key: collections.OrderedDict[Key, AIMDSemaphore] = dataclasses.field(
+        default_factory=collections.OrderedDict
+    )
     start: int
 
     @abc.abstractmethod
@@ -262,35 +829,101 @@ class EnterContext[** Params, Return](
         self,
         *args: Params.args,
         **kwargs: Params.kwargs,
-    ) -> (ExitContext[Params, Return], _base.EnterContext[Params, Return]):
-        return self.exit_context_t(semaphore=self.semaphore), self.next_enter_context
+    ) -> (ExitContext[Params, Return], _base.EnterContext[Params, Return]): ...
 
     def __get__(self, instance: _base.Instance, owner) -> typing.Self:
         with self.instance_lock:
             if (enter_context := self.enter_context_by_instance.get(instance)) is None:
                 enter_context = self.enter_context_by_instance[instance] = dataclasses.replace(
                     self,
-                    semaphore=self.semaphore_t(
-                        additive_increase=self.semaphore.additive_increase,
-                        multiplicative_decrease=self.semaphore.multiplicative_decrease,
-                        max_holders=self.semaphore.max_holders,
-                        max_waiters=self.semaphore.max_waiters,
-                        per_pane=self.semaphore.per_pane,
-                        per_window=self.semaphore.per_window,
-                        value=self.start,
-                        window=self.semaphore.window,
-                    ),
+                    semaphore=self._new_semaphore(),
+                    semaphore_by_key=collections.OrderedDict(),
                     start=self.start,
                 )
             return enter_context
 
+    def _new_semaphore(self, key: Key | None = None) -> AIMDSemaphore:
+        shared = self.semaphore.shared
+        if shared is not None and key is not None:
+            shared = dataclasses.replace(shared, name=f'{shared.name}__{key!r}')
+
+        return self.semaphore_t(
+            additive_increase=self.semaphore.additive_increase,
+            aging=self.semaphore.aging,
+            algorithm=self.semaphore.algorithm,
+            backoff_from=self.semaphore.backoff_from,
+            burst=self.semaphore.burst,
+            congestion=self.semaphore.congestion,
+            multiplicative_decrease=self.semaphore.multiplicative_decrease,
+            max_holders=self.semaphore.max_holders,
+            max_samples=self.semaphore.max_samples,
+            max_waiters=self.semaphore.max_waiters,
+            per_pane=self.semaphore.per_pane,
+            per_window=self.semaphore.per_window,
+            rate=self.semaphore.rate,
+            sample_interval=self.semaphore.sample_interval,
+            shared=shared,
+            value=self.start,
+            window=self.semaphore.window,
+        )
+
+    @contextlib.contextmanager
+    def _semaphore(self, *args: Params.args, **kwargs: Params.kwargs) -> typing.Iterator[AIMDSemaphore]:
+        """Yields the semaphore of the call's key, created on first use of the key, pinned until the block exits.
+
+        The least recently used idle semaphores are dropped to stay within `max_keys`. Busy semaphores are kept, so
+        more than `max_keys` may be kept while that many keys are busy at once. The block should acquire, so that the
+        semaphore is busy with the call by the time it is unpinned.
+        """
+        if self.generate_key is None:
+            yield self.semaphore
+            return
+
+        key = self.generate_key(*args, **kwargs)
+        with self.instance_lock:
+            if (semaphore := self.semaphore_by_key.pop(key, None)) is None:
+                if (excess := len(self.semaphore_by_key) + 1 - self.max_keys) > 0:
+                    idle_keys = [other_key for other_key, other in self.semaphore_by_key.items() if other.idle]
+                    for idle_key in idle_keys[:excess]:
+                        del self.semaphore_by_key[idle_key]
+                semaphore = self._new_semaphore(key)
+            self.semaphore_by_key[key] = semaphore
+            semaphore.pinned += 1
+        try:
+            yield semaphore
+        finally:
+            with self.instance_lock:
+                semaphore.pinned -= 1
+
+    def snapshots(self) -> dict[Key | None, Snapshot]:
+        """Returns a snapshot of each limiter by key, or of the only limiter by None if calls are not keyed."""
+        if self.generate_key is None:
+            return {None: self.semaphore.snapshot()}
+        with self.instance_lock:
+            semaphore_by_key = [*self.semaphore_by_key.items()]
+        return {key: semaphore.snapshot() for key, semaphore in semaphore_by_key}
+
+    def _deadline(self) -> float | None:
+        deadline = Decorator.deadline_var.get()
+        if self.max_wait is not None and (deadline is None or time.monotonic() + self.max_wait < deadline):
+            deadline = time.monotonic() + self.max_wait
+        return deadline
+
+    def _priority(self, *args: Params.args, **kwargs: Params.kwargs) -> Priority:
+        if (priority := Decorator.priority_var.get()) is not None:
+            return priority
+        return 0.0 if self.generate_priority is None else self.generate_priority(*args, **kwargs)
+
 
 @dataclasses.dataclass(frozen=True, kw_only=True)
 class ExitContext[** Params, Return](
     Context[Params, Return],
     _base.ExitContext[Params, Return],
     abc.ABC,
-): ...
+):
+    cost: Cost
+    # When the call was admitted, on the `time.monotonic` clock.
+    start: float
 
 
 @dataclasses.dataclass(frozen=True, kw_only=True)
@@ -304,8 +937,11 @@ class AsyncEnterContext[** Params, Return](
         *args: Params.args,
         **kwargs: Params.kwargs,
     ) -> (AsyncExitContext[Params, Return], _base.AsyncEnterContext[Params, Return]):
-        await self.semaphore.acquire()
-        return super().__call__(*args, **kwargs)
+        cost = 1 if self.generate_cost is None else self.generate_cost(*args, **kwargs)
+        priority = self._priority(*args, **kwargs)
+        with self._semaphore(*args, **kwargs) as semaphore:
+            await semaphore.acquire(cost, priority, self._deadline())
+        return self.exit_context_t(cost=cost, semaphore=semaphore, start=time.monotonic()), self.next_enter_context
 
 
 @dataclasses.dataclass(frozen=True, kw_only=True)
@@ -319,8 +955,11 @@ class MultiEnterContext[** Params, Return](
         *args: Params.args,
         **kwargs: Params.kwargs,
     ) -> (MultiExitContext[Params, Return], _base.MultiEnterContext[Params, Return]):
-        self.semaphore.acquire()
-        return super().__call__(*args, **kwargs)
+        cost = 1 if self.generate_cost is None else self.generate_cost(*args, **kwargs)
+        priority = self._priority(*args, **kwargs)
+        with self._semaphore(*args, **kwargs) as semaphore:
+            semaphore.acquire(cost, priority, self._deadline())
+        return self.exit_context_t(cost=cost, semaphore=semaphore, start=time.monotonic()), self.next_enter_context
 
 
 @dataclasses.dataclass(frozen=True, kw_only=True)
@@ -334,10 +973,11 @@ class AsyncExitContext[** Params, Return](
     semaphore_t: typing.ClassVar = AsyncAIMDSemaphore
 
     async def __call__(self, result: _base.Raise | Return) -> _base.Raise | Return:
-        if isinstance(result, _base.Raise):
-            await self.semaphore.release(ok=False)
-        else:
-            await self.semaphore.release(ok=True)
+        await self.semaphore.release(
+            latency=time.monotonic() - self.start,
+            cost=self.cost,
+            exception=result.exc_val if isinstance(result, _base.Raise) else None,
+        )
         return result
 
 
@@ -351,10 +991,11 @@ class MultiExitContext[** Params, Return](
     semaphore_t: typing.ClassVar = MultiAIMDSemaphore
 
     def __call__(self, result: _base.Raise | Return) -> _base.Raise | Return:
-        if isinstance(result, _base.Raise):
-            self.semaphore.release(ok=False)
-        else:
-            self.semaphore.release(ok=True)
+        self.semaphore.release(
+            latency=time.monotonic() - self.start,
+            cost=self.cost,
+            exception=result.exc_val if isinstance(result, _base.Raise) else None,
+        )
         return result
 
 
@@ -378,8 +1019,84 @@ class Decorator[** Params, Return](_base.Decorator[Params, Return]):
     per_pane: int = sys.maxsize
     per_window: int = sys.maxsize
 
+    # If set, calls are admitted at no more than `rate` per second on average, with up to `burst` calls admitted at once
+    #  after a lull. Admission is reserved by GCRA arithmetic on a monotonic clock, so state and work per call are
+    #  constant at any rate, unlike `per_window`, whose state grows with `per_window / per_pane`. Calls that arrive
+    #  early sleep until their reserved time.
+    rate: typing.Annotated[float, annotated_types.Gt(0.0)] | None = None
+    burst: typing.Annotated[int, annotated_types.Gt(0)] = 1
+
+    # How the concurrency value adapts to successful calls. 'aimd' grows it by `additive_increase` until calls fail.
+    #  'gradient' and 'vegas' measure the latency of each call against the lowest seen, and stop growing or shrink the
+    #  value once latency rises, which settles concurrency where upstream throughput stops improving rather than where
+    #  upstream starts failing. The lowest latency ages toward each higher one by 1%, as the long-term average of
+    #  gradient2 does, so a lasting slowdown upstream becomes the new baseline. See `AIMDSemaphore`.
+    algorithm: Algorithm = 'aimd'
+
+    # If set, calls are throttled separately per key returned by `key` given the call arguments, e.g. per tenant or per
+    #  host, each key with its own value, holders, and windows as configured here. Limiters are created on first use of
+    #  a key, and the least recently used idle ones are dropped beyond `max_keys`.
+    key: GenerateKey[Params] | None = None
+    max_keys: typing.Annotated[int, annotated_types.Gt(0)] = 1024
+
+    # If set, each call consumes as many units as `cost` returns given the call arguments, e.g. rows or tokens, from
+    #  `max_holders`, `per_window`, and `rate` alike, instead of 1. Waiters are still admitted in order, so a large call
+    #  at the head of the queue holds back smaller ones until its cost is free.
+    cost: GenerateCost[Params] | None = None
+
+    # If set, waiters are served in order of the priority `priority` returns given the call arguments, lowest first,
+    #  rather than in order of arrival. A priority set in `priority_var` overrides it for calls in that context. With
+    #  `aging`, each `aging` seconds a caller waits counts as 1 less priority, so bulk calls are not starved outright.
+    priority: GeneratePriority[Params] | None = None
+    aging: typing.Annotated[float, annotated_types.Gt(0.0)] | None = None
+
+    # Priority of calls made in the current context, e.g. `Throttle.priority_var.set(-1)` while serving interactive
+    #  requests. None defers to `priority`.
+    priority_var: typing.ClassVar[contextvars.ContextVar[Priority | None]] = contextvars.ContextVar(
+        'funktools.Throttle.priority', default=None
+    )
+
+    # If set, callers are rejected rather than wait more than `max_wait` seconds for admission. Callers are rejected
+    #  upfront when their wait is estimated to exceed it, so no time is spent queueing for a call that would be too
+    #  late to be of use.
+    max_wait: typing.Annotated[float, annotated_types.Ge(0.0)] | None = None
+
+    # Deadline for admission of calls made in the current context, on the `time.monotonic` clock, e.g. the time by
+    #  which a client expects a response. The earlier of this and `max_wait` applies.
+    deadline_var: typing.ClassVar[contextvars.ContextVar[float | None]] = contextvars.ContextVar(
+        'funktools.Throttle.deadline', default=None
+    )
+
+    # If set, given each exception raised by the callee. A number of seconds returned pauses admission of every caller
+    #  for that long, e.g. the Retry-After of an HTTP 429 or 503 response. None leaves admission as is.
+    backoff_from: Backoff | None = None
+
+    # If set, given each exception raised by the callee. Exceptions it returns False for, e.g. validation errors or
+    #  404s, say nothing about upstream load and leave the concurrency value as is rather than cutting it in half.
+    congestion: Congestion | None = None
+
+    # If set, `max_holders` and `per_window` are enforced across every process on the host that uses this SQLite file,
+    #  on top of each process' own limits. State is kept per decorated function, and per key with `key`. See `Shared`.
+    shared: pathlib.Path | str | None = None
+
+    # If set, each limiter keeps its last `max_samples` snapshots, taken at most every `sample_interval` seconds as
+    #  calls are admitted or rejected. See `AIMDSemaphore.samples` and `snapshots`.
+    sample_interval: typing.Annotated[float, annotated_types.Gt(0.0)] | None = None
+    max_samples: typing.Annotated[int, annotated_types.Gt(0)] = 1024
+
     register: typing.ClassVar[_base.Register] = _base.Register()
 
+    @classmethod
+    def snapshots(cls) -> dict[_base.Register.Key, dict[Key | None, Snapshot]]:
+        """Returns snapshots of the limiters of every decorated function in `register`, by register key.
+
+        Limiters of methods are per instance, and only the limiters of the unbound method are included.
+        """
+        return {
+            register_key: decorated.enter_context.snapshots()
+            for register_key, decorated in [*cls.register.decorateds.items()]
+        }
+
     def __call__(
         self,
         decoratee: _base.Decoratee[Params, Return] | _base.Decorated[Params, Return],
@@ -399,14 +1116,34 @@ class Decorator[** Params, Return](_base.Decorator[Params, Return]):
             enter_context=enter_context_t(
                 semaphore=enter_context_t.semaphore_t(
                     additive_increase=self.additive_increase if self.multiplicative_decrease else 0,
+                    aging=self.aging,
+                    algorithm=self.algorithm,
+                    backoff_from=self.backoff_from,
+                    burst=self.burst,
+                    congestion=self.congestion,
                     multiplicative_decrease=self.multiplicative_decrease if self.additive_increase else 0.0,
                     max_holders=self.max_holders,
+                    max_samples=self.max_samples,
                     max_waiters=self.max_waiters,
                     per_pane=min(self.per_pane, self.per_window),
                     per_window=self.per_window,
+                    rate=self.rate,
+                    sample_interval=self.sample_interval,
+                    shared=None if self.shared is None else Shared(
+                        db_path=self.shared,
+                        max_holders=self.max_holders,
+                        name='__'.join(decoratee.register_key),
+                        per_window=self.per_window,
+                        window=self.window,
+                    ),
                     value=self.start,
                     window=self.window,
                 ),
+                generate_cost=self.cost,
+                generate_key=self.key,
+                generate_priority=self.priority,
+                max_wait=self.max_wait,
+                max_keys=self.max_keys,
                 next_enter_context=decoratee.enter_context,
                 start=self.start,
             ),
@@ -0,0 +1,258 @@
+"""Maintenance commands for SQLiteCache database files.
+
+Commands only open the database file, so the application that owns the caches need not be importable.
+"""
+import os
+import sqlite3
+import time
+import typing
+
+import funktools
+
+from .._backend import BlobBackend, Statements
+
+_DBPath = typing.Annotated[str, 'Path of the SQLite database file.']
+_Table = typing.Annotated[str | None, 'Only this table. By default, every cache table.']
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    if not os.path.exists(db_path):
+        raise funktools.CLI.Exception(f'{db_path=} does not exist.')
+
+    return sqlite3.connect(db_path, isolation_level=None)
+
+
+def _has_table(connection: sqlite3.Connection, table_name: str, schema: str = 'main') -> bool:
+    return connection.execute(
+        f"SELECT COUNT(*) FROM `{schema}`.sqlite_master WHERE type = 'table' AND name = ?", (table_name,)
+    ).fetchone() == (1,)
+
+
+def _cache_tables(connection: sqlite3.Connection, table: str | None, schema: str = 'main') -> list[str]:
+    """Returns names of tables with the SQLiteCache schema, or just `table` if it is one."""
+    table_names = [
+        table_name
+        for [table_name] in connection.execute(
+            f"SELECT name FROM `{schema}`.sqlite_master WHERE type = 'table' ORDER BY name"
+        ).fetchall()
+        if {column for _, column, *_ in connection.execute(f'PRAGMA `{schema}`.table_info(`{table_name}`)')} == {
+            *Statements.columns
+        }
+    ]
+
+    if table is None:
+        return table_names
+    if table not in table_names:
+        raise funktools.CLI.Exception(f'{table=} is not a cache table.')
+
+    return [table]
+
+
+def _copy(source_path: str, destination_path: str, table: str | None) -> None:
+    connection = _connect(source_path)
+    table_names = _cache_tables(connection, table)
+
+    destination = sqlite3.connect(destination_path, isolation_level=None)
+    destination.execute(Statements.create_versions_table)
+    for table_name in table_names:
+        destination.execute(Statements(table_name=table_name).create_table)
+        destination.execute(Statements(table_name=table_name).create_index)
+    destination.close()
+
+    connection.execute('ATTACH DATABASE ? AS destination', (destination_path,))
+    versions = _has_table(connection, '__funktools_versions__')
+    connection.execute('BEGIN')
+    try:
+        for table_name in table_names:
+            count = connection.execute(
+                f'INSERT OR REPLACE INTO `destination`.`{table_name}` ({', '.join(Statements.columns)})'
+                f' SELECT {', '.join(Statements.columns)} FROM `main`.`{table_name}`'
+            ).rowcount
+            if versions:
+                connection.execute(
+                    'INSERT OR REPLACE INTO `destination`.`__funktools_versions__` (table_name, version)'
+                    ' SELECT table_name, version FROM `main`.`__funktools_versions__` WHERE table_name = ?',
+                    (table_name,),
+                )
+            print(f'{table_name}: {count} rows')
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+
+@funktools.CLI()
+def stats(db_path: _DBPath, /) -> None:
+    """Prints row counts, key and value bytes, and hit stats of each cache table.
+
+    Hits and misses are those recorded by SQLiteCache processes, which add their counts periodically and at exit.
+
+    Ex:
+        python3 -m funktools.cache stats cache.db
+    """
+    connection = _connect(db_path)
+    stats_by_table_name = dict()
+    if _has_table(connection, '__funktools_stats__'):
+        stats_by_table_name = {
+            table_name: (hits, misses)
+            for table_name, hits, misses in connection.execute(
+                'SELECT table_name, hits, misses FROM `__funktools_stats__`'
+            )
+        }
+
+    page_count, = connection.execute('PRAGMA page_count').fetchone()
+    freelist_count, = connection.execute('PRAGMA freelist_count').fetchone()
+    page_size, = connection.execute('PRAGMA page_size').fetchone()
+    print(f'file: {page_count * page_size} bytes, {freelist_count * page_size} free')
+
+    print(f'{'table':<48} {'rows':>10} {'bytes':>14} {'hits':>10} {'misses':>10} {'hit ratio':>9}')
+    for table_name in _cache_tables(connection, None):
+        rows, bytes_ = connection.execute(
+            f'SELECT COUNT(*), IFNULL(SUM(LENGTH(key) + IFNULL(LENGTH(canonical_key), 0) + LENGTH(value)), 0)'
+            f' FROM `{table_name}`'
+        ).fetchone()
+        hits, misses = stats_by_table_name.get(table_name, (0, 0))
+        hit_ratio = f'{hits / (hits + misses):.3f}' if hits + misses else '-'
+        print(f'{table_name:<48} {rows:>10} {bytes_:>14} {hits:>10} {misses:>10} {hit_ratio:>9}')
+
+
+@funktools.CLI()
+def purge_expired(
+    db_path: _DBPath,
+    /,
+    *,
+    older_than: typing.Annotated[int, 'Delete rows not written or sampled as accessed in this many seconds.'],
+    table: _Table = None,
+) -> None:
+    """Deletes rows not accessed in `older_than` seconds and leases that have expired.
+
+    Ex:
+        python3 -m funktools.cache purge_expired cache.db --older-than 86400
+    """
+    connection = _connect(db_path)
+    now = time.time()
+    for table_name in _cache_tables(connection, table):
+        count = connection.execute(
+            f'DELETE FROM `{table_name}` WHERE last_access < ?', (now - older_than,)
+        ).rowcount
+        if _has_table(connection, lease_table_name := f'{table_name}__lease'):
+            connection.execute(f'DELETE FROM `{lease_table_name}` WHERE expire < ?', (now,))
+        print(f'{table_name}: {count} rows')
+
+
+@funktools.CLI()
+def collect(
+    db_path: _DBPath,
+    blob_directory: typing.Annotated[str, 'The `blob_directory` the caches were decorated with.'],
+    /,
+    *,
+    max_bytes: typing.Annotated[int | None, 'Then delete least recently written blobs until this many remain.'] = None,
+    table: _Table = None,
+) -> None:
+    """Deletes blob files that no row of their cache table references, e.g. after the row was evicted or overwritten.
+
+    A blob written while this runs may be deleted before its row is written, which then reads as a miss.
+
+    Ex:
+        python3 -m funktools.cache collect cache.db blobs
+    """
+    connection = _connect(db_path)
+    for table_name in _cache_tables(connection, table):
+        if not os.path.isdir(directory := os.path.join(blob_directory, table_name)):
+            continue
+        count = BlobBackend.collect_directory(
+            directory,
+            (
+                value for [value] in connection.execute(
+                    f'SELECT value FROM `{table_name}` WHERE SUBSTR(value, 1, ?) = ?',
+                    (len(BlobBackend.reference_prefix), BlobBackend.reference_prefix),
+                )
+            ),
+            max_bytes,
+        )
+        print(f'{table_name}: {count} bytes')
+
+
+@funktools.CLI()
+def vacuum(
+    db_path: _DBPath,
+    /,
+    *,
+    into: typing.Annotated[str | None, 'Write a vacuumed copy to this path instead of rebuilding in place.'] = None,
+) -> None:
+    """Rebuilds the database file, returning free pages to the filesystem.
+
+    Rebuilding in place holds a write lock for the whole rebuild and needs free disk space of up to twice the file size.
+    Once `compact` has run, it releases free pages while caches stay in use.
+
+    Ex:
+        python3 -m funktools.cache vacuum cache.db
+    """
+    connection = _connect(db_path)
+    if into is None:
+        connection.execute('VACUUM')
+    else:
+        connection.execute('VACUUM INTO ?', (into,))
+
+
+@funktools.CLI()
+def compact(
+    db_path: _DBPath,
+    /,
+    *,
+    pages: typing.Annotated[int | None, 'Release at most this many free pages. By default, all of them.'] = None,
+) -> None:
+    """Releases free pages to the filesystem.
+
+    The first compaction of a file switches it to incremental auto-vacuum. That takes one full `vacuum`, which locks the
+    file for the whole rebuild, so run it while caches are idle. Later compactions release pages in short transactions,
+    so caches stay usable throughout.
+
+    Ex:
+        python3 -m funktools.cache compact cache.db
+    """
+    connection = _connect(db_path)
+    page_size, = connection.execute('PRAGMA page_size').fetchone()
+    page_count, = connection.execute('PRAGMA page_count').fetchone()
+
+    if connection.execute('PRAGMA auto_vacuum').fetchone() != (2,):
+        connection.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        connection.execute('VACUUM')
+    else:
+        # Each step of the pragma releases one page, so it must be stepped to completion.
+        connection.execute(f'PRAGMA incremental_vacuum({pages or 0})').fetchall()
+    connection.execute('PRAGMA optimize')
+
+    print(f'{page_count * page_size} -> {connection.execute('PRAGMA page_count').fetchone()[0] * page_size} bytes')
+
+
+@funktools.CLI()
+def export_tables(
+    db_path: _DBPath,
+    path: typing.Annotated[str, 'Path of the SQLite database file to export to. Created if missing.'],
+    /,
+    *,
+    table: _Table = None,
+) -> None:
+    """Copies cache tables and their versions into another database file, replacing rows with equal keys.
+
+    Ex:
+        python3 -m funktools.cache export_tables cache.db backup.db
+    """
+    _copy(db_path, path, table)
+
+
+@funktools.CLI()
+def import_tables(
+    db_path: _DBPath,
+    path: typing.Annotated[str, 'Path of a SQLite database file written by `export_tables`.'],
+    /,
+    *,
+    table: _Table = None,
+) -> None:
+    """Copies cache tables and their versions from another database file, replacing rows with equal keys.
+
+    Ex:
+        python3 -m funktools.cache import_tables cache.db backup.db
+    """
+    _copy(path, db_path, table)
@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+"""Maintenance commands for SQLiteCache database files.
+
+Ex.
+
+```bash
+python3 -m funktools.cache -h
+```
+
+"""
+
+import funktools
+
+funktools.CLI().run(__package__)
@@ -13,6 +13,7 @@ setup(
     description='Python 3.10+ async/sync memoize and rate decorators',
     extras_require={
         'base': (base := ['pydantic']),
+        'numpy': (numpy := ['numpy']),
         'sql_cache': (sql_cache := base + ['sqlalchemy']),
         'sqlite_cache': (sqlite_cache := sql_cache + ['aiosqlite']),
         'requirements': (requirements := base + sql_cache + sqlite_cache),
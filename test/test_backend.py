@@ -0,0 +1,240 @@
+import pathlib
+import sqlite3
+import tempfile
+import threading
+import time
+
+import pytest
+
+import funktools
+
+
+@pytest.fixture(params=['dbm', 'filesystem', 'sharded', 'sqlite'])
+def backend(request) -> funktools.Backend:
+    with tempfile.TemporaryDirectory() as directory:
+        match request.param:
+            case 'dbm':
+                backend = funktools.DBMBackend(path=pathlib.Path(directory) / 'db')
+                yield backend
+                backend.close()
+            case 'filesystem':
+                yield funktools.FilesystemBackend(directory=directory)
+            case 'sharded':
+                yield funktools.ShardedBackend(backends=[
+                    funktools.SQLiteBackend(db_path=pathlib.Path(directory) / f'db.{shard}', table_name='foo')
+                    for shard in range(3)
+                ])
+            case 'sqlite':
+                yield funktools.SQLiteBackend(db_path=pathlib.Path(directory) / 'db', table_name='foo')
+
+
+def test_backend_is_backend(backend) -> None:
+    assert isinstance(backend, funktools.Backend)
+
+
+def test_get_missing(backend) -> None:
+    assert backend.get('', 'foo') is None
+
+
+def test_put_get(backend) -> None:
+    backend.put('', b'foo', (b'bar', None))
+    backend.put('', 'foo', ('baz', 'foo'))
+    assert backend.get('', b'foo') == (b'bar', None)
+    assert backend.get('', 'foo') == ('baz', 'foo')
+    assert backend.get('other', 'foo') is None
+
+
+def test_put_many_get_many(backend) -> None:
+    backend.put_many([(('', 'foo'), ('0', None)), (('', 'bar'), ('1', None)), (('other', 'baz'), ('2', None))])
+    assert backend.get_many('', ['foo', 'bar', 'baz']) == {'foo': ('0', None), 'bar': ('1', None)}
+
+
+def test_put_replaces(backend) -> None:
+    backend.put('', 'foo', ('0', None))
+    backend.put('', 'foo', ('1', None))
+    assert backend.get('', 'foo') == ('1', None)
+
+
+def test_delete(backend) -> None:
+    backend.put('', 'foo', ('0', None))
+    backend.delete('', 'foo')
+    backend.delete('', 'bar')
+    assert backend.get('', 'foo') is None
+
+
+def test_scan(backend) -> None:
+    backend.put_many([(('', 'foo'), ('0', None)), (('other', 'bar'), ('1', 'bar'))])
+    assert sorted(backend.scan()) == [('', 'foo', ('0', None)), ('other', 'bar', ('1', 'bar'))]
+
+
+def test_purge(backend) -> None:
+    backend.put_many([(('', 'foo'), ('0', None)), (('other', 'bar'), ('1', None))])
+    backend.purge()
+    assert [*backend.scan()] == []
+
+
+@pytest.mark.parametrize('version, expected', [('0', ('0', None)), ('1', None)])
+def test_set_version(backend, version, expected) -> None:
+    backend.set_version('0')
+    backend.put('', 'foo', ('0', None))
+    backend.set_version(version)
+    assert backend.get('', 'foo') == expected
+
+
+def test_sqlite_lease() -> None:
+    backend = funktools.SQLiteBackend(table_name='test_sqlite_lease')
+    assert backend.acquire_lease('', 'foo', 60.0)
+    assert not backend.acquire_lease('', 'foo', 60.0)
+    backend.put('', 'foo', ('0', None))
+    assert backend.acquire_lease('', 'foo', 60.0)
+    backend.release_lease('', 'foo')
+    assert backend.acquire_lease('', 'foo', 60.0)
+
+
+def test_sharded_spreads_keys() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        backend = funktools.ShardedBackend(backends=[
+            funktools.SQLiteBackend(db_path=pathlib.Path(directory) / f'db.{shard}', table_name='foo')
+            for shard in range(2)
+        ])
+        backend.put_many([(('', str(key)), ('0', None)) for key in range(64)])
+        assert all(0 < len([*shard.scan()]) < 64 for shard in backend.backends)
+        assert {key for _, key, _ in backend.scan()} == {str(key) for key in range(64)}
+
+
+@pytest.mark.parametrize('backend_t', ['dbm', 'filesystem'])
+def test_sqlite_cache_with_backend(backend_t) -> None:
+    call_count = 0
+
+    with tempfile.TemporaryDirectory() as directory:
+        for _ in range(2):
+            match backend_t:
+                case 'dbm':
+                    backend = funktools.DBMBackend(path=pathlib.Path(directory) / 'db')
+                case 'filesystem':
+                    backend = funktools.FilesystemBackend(directory=directory)
+
+            @funktools.SQLiteCache(backend=backend)
+            def foo(x) -> int:
+                nonlocal call_count
+                call_count += 1
+                return x
+
+            assert foo(0) == 0
+            assert foo(0) == 0
+
+            if isinstance(backend, funktools.DBMBackend):
+                backend.close()
+
+    assert call_count == 1
+
+
+def test_sqlite_cache_lease_requires_lease_backend() -> None:
+    with tempfile.TemporaryDirectory() as directory, pytest.raises(TypeError):
+        @funktools.SQLiteCache(backend=funktools.FilesystemBackend(directory=directory), lease_duration=60.0)
+        def foo() -> None: ...
+
+
+@pytest.fixture
+def blob_backend() -> funktools.BlobBackend:
+    with tempfile.TemporaryDirectory() as directory:
+        yield funktools.BlobBackend(
+            backend=funktools.SQLiteBackend(db_path=pathlib.Path(directory) / 'db', table_name='foo'),
+            directory=pathlib.Path(directory) / 'blobs',
+            threshold=4,
+        )
+
+
+def test_blob_stores_large_values_in_files(blob_backend) -> None:
+    blob_backend.put_many([(('', 'foo'), (b'small', None)), (('', 'bar'), (b'sm', None))])
+    assert len([*blob_backend.directory.glob('*/*')]) == 1
+    assert blob_backend.backend.get('', 'foo')[0].startswith(blob_backend.reference_prefix)
+    assert blob_backend.backend.get('', 'bar') == (b'sm', None)
+
+
+def test_blob_get_returns_memoryview(blob_backend) -> None:
+    blob_backend.put('', 'foo', (b'large', 'foo'))
+    value, canonical_key = blob_backend.get('', 'foo')
+    assert isinstance(value, memoryview)
+    assert (bytes(value), canonical_key) == (b'large', 'foo')
+    assert {key: bytes(value) for key, (value, _) in blob_backend.get_many('', ['foo']).items()} == {'foo': b'large'}
+
+
+def test_blob_shares_equal_values(blob_backend) -> None:
+    blob_backend.put_many([(('', 'foo'), (b'large', None)), (('', 'bar'), (b'large', None))])
+    assert len([*blob_backend.directory.glob('*/*')]) == 1
+
+
+def test_blob_stores_prefixed_values_in_files(blob_backend) -> None:
+    blob_backend.put('', 'foo', (blob_backend.reference_prefix, None))
+    assert bytes(blob_backend.get('', 'foo')[0]) == blob_backend.reference_prefix
+
+
+def test_blob_missing_file_is_miss(blob_backend) -> None:
+    blob_backend.put('', 'foo', (b'large', None))
+    for path in blob_backend.directory.glob('*/*'):
+        path.unlink()
+    assert blob_backend.get('', 'foo') is None
+
+
+def test_blob_collect_removes_unreferenced(blob_backend) -> None:
+    blob_backend.put_many([(('', 'foo'), (b'large0', None)), (('', 'bar'), (b'large1', None))])
+    blob_backend.delete('', 'foo')
+    blob_backend.collect()
+    assert len([*blob_backend.directory.glob('*/*')]) == 1
+    assert bytes(blob_backend.get('', 'bar')[0]) == b'large1'
+
+
+def test_blob_collects_every_collect_every_writes(blob_backend) -> None:
+    blob_backend.collect_every = 2
+    blob_backend.put('', 'foo', (b'large0', None))
+    blob_backend.put('', 'foo', (b'large1', None))
+    assert len([*blob_backend.directory.glob('*/*')]) == 1
+    assert (bytes(blob_backend.get('', 'foo')[0]), blob_backend.total_bytes) == (b'large1', 6)
+
+
+def test_blob_max_bytes_removes_least_recently_written(blob_backend) -> None:
+    blob_backend.max_bytes = 12
+    for key, value in [('foo', b'large0'), ('bar', b'large1'), ('foo', b'large0'), ('baz', b'large2')]:
+        blob_backend.put('', key, (value, None))
+        time.sleep(0.01)
+    assert blob_backend.get('', 'bar') is None
+    assert {key: bytes(blob_backend.get('', key)[0]) for key in ['foo', 'baz']} == {'foo': b'large0', 'baz': b'large2'}
+    assert blob_backend.total_bytes == 12
+
+
+def test_sqlite_reuses_cursor_per_thread() -> None:
+    backend = funktools.SQLiteBackend(table_name='test_sqlite_reuses_cursor_per_thread')
+    assert backend.cursor is backend.cursor
+    cursors = []
+    thread = threading.Thread(target=lambda: cursors.append(backend.cursor))
+    thread.start()
+    thread.join()
+    assert cursors[0] is not backend.cursor
+
+
+def test_sqlite_formats_statements_once() -> None:
+    statements = funktools.SQLiteBackend(table_name='test_sqlite_formats_statements_once').statements
+    assert statements.get is statements.get
+    assert statements.get_many(3) is statements.get_many(3)
+
+
+def test_sqlite_replaces_table_of_older_schema() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        sqlite3.connect(pathlib.Path(directory) / 'db', isolation_level=None).execute(
+            'CREATE TABLE `foo` (key STRING PRIMARY KEY NOT NULL UNIQUE, value STRING NOT NULL)'
+        )
+        backend = funktools.SQLiteBackend(db_path=pathlib.Path(directory) / 'db', table_name='foo')
+        backend.put('', b'foo', (b'bar', None))
+        assert bytes(backend.get('', b'foo')[0]) == b'bar'
+
+
+def test_sqlite_max_rows_evicts_coldest_rows() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        backend = funktools.SQLiteBackend(
+            db_path=pathlib.Path(directory) / 'db', evict_every=4, max_rows=8, table_name='foo',
+        )
+        for i in range(32):
+            backend.put('', f'{i:02}', ('x', None))
+        assert [key for _, key, _ in backend.scan()] == [f'{i:02}' for i in range(24, 32)]
+        assert (backend.evictor.total_rows, backend.evictor.total_bytes) == (8, 8 * 3)
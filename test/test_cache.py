@@ -0,0 +1,101 @@
+import pathlib
+import sqlite3
+import tempfile
+
+import pytest
+
+import funktools
+import funktools.cache
+
+
+@pytest.fixture
+def db_path() -> str:
+    with tempfile.NamedTemporaryFile() as f:
+        yield f.name
+
+
+@pytest.fixture
+def foo(db_path) -> funktools.SQLiteCache:
+    @funktools.SQLiteCache(db_path=db_path)
+    def foo(x) -> int:
+        return x
+
+    for x in [0, 0, 0, 1]:
+        foo(x)
+    foo.enter_context.backend.flush_stats()
+
+    return foo
+
+
+def run(*args: str) -> None:
+    funktools.CLI().run('funktools.cache', [*args])
+
+
+def test_stats(capsys, db_path, foo) -> None:
+    run('stats', db_path)
+    table_name = foo.enter_context.backend.table_name
+    assert f'{table_name:<48} {2:>10} {2 * len(repr(((0,), ()))) + 2:>14} {2:>10} {2:>10} {0.5:>9.3f}' in (
+        capsys.readouterr().out.splitlines()
+    )
+
+
+def test_purge_expired(db_path, foo) -> None:
+    table_name = foo.enter_context.backend.table_name
+    connection = sqlite3.connect(db_path, isolation_level=None)
+    connection.execute(f'UPDATE `{table_name}` SET last_access = 0.0 WHERE value = ?', ('0',))
+    run('purge_expired', db_path, '--older-than', '60')
+    assert connection.execute(f'SELECT value FROM `{table_name}`').fetchall() == [('1',)]
+
+
+def test_collect(db_path) -> None:
+    with tempfile.TemporaryDirectory() as blob_directory:
+        @funktools.SQLiteCache(
+            db_path=db_path, blob_directory=blob_directory, blob_threshold=0, dumps_value=bytes, loads_value=bytes,
+        )
+        def foo(x) -> bytes:
+            return x
+
+        table_name = foo.enter_context.backend.backend.table_name
+        foo(b'0')
+        foo(b'1')
+        sqlite3.connect(db_path, isolation_level=None).execute(f'DELETE FROM `{table_name}` WHERE key LIKE ?', ('%0%',))
+        run('collect', db_path, blob_directory)
+        assert len([*pathlib.Path(blob_directory, table_name).glob('*/*')]) == 1
+
+
+def test_export_import_tables(db_path, foo) -> None:
+    table_name = foo.enter_context.backend.table_name
+    with tempfile.NamedTemporaryFile() as f:
+        run('export_tables', db_path, f.name)
+        sqlite3.connect(db_path, isolation_level=None).execute(f'DELETE FROM `{table_name}`')
+        run('import_tables', db_path, f.name, '--table', table_name)
+
+    assert sorted(sqlite3.connect(db_path).execute(f'SELECT value FROM `{table_name}`').fetchall()) == [
+        ('0',), ('1',)
+    ]
+
+
+def test_unknown_table(db_path, foo) -> None:
+    with tempfile.NamedTemporaryFile() as f, pytest.raises(funktools.CLI.Exception):
+        run('export_tables', db_path, f.name, '--table', 'bar')
+
+
+def test_compact(db_path, foo) -> None:
+    table_name = foo.enter_context.backend.table_name
+    sqlite3.connect(db_path, isolation_level=None).execute(
+        f"INSERT INTO `{table_name}` (namespace, key, value) VALUES ('', 'bar', ?)", (b'0' * 2 ** 16,)
+    )
+    run('compact', db_path)
+    assert sqlite3.connect(db_path).execute('PRAGMA auto_vacuum').fetchone() == (2,)
+
+    sqlite3.connect(db_path, isolation_level=None).execute(f"DELETE FROM `{table_name}` WHERE key = 'bar'")
+    assert sqlite3.connect(db_path).execute('PRAGMA freelist_count').fetchone() != (0,)
+    run('compact', db_path)
+    assert sqlite3.connect(db_path).execute('PRAGMA freelist_count').fetchone() == (0,)
+
+
+def test_vacuum_into(db_path, foo) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        run('vacuum', db_path, '--into', f'{directory}/db')
+        table_name = foo.enter_context.backend.table_name
+        assert sqlite3.connect(f'{directory}/db').execute(f'SELECT COUNT(*) FROM `{table_name}`').fetchall() == [(2,)]
@@ -1,5 +1,7 @@
 import asyncio
 import inspect
+import pathlib
+import pickle
 import unittest.mock
 
 import pytest
@@ -329,3 +331,118 @@ def test_multi_exceptions_are_saved() -> None:
     with pytest.raises(FooException):
         foo()
     assert call_count == 1
+
+
+def test_multi_exceptions_are_not_saved() -> None:
+    call_count = 0
+
+    class FooException(Exception):
+        ...
+
+    @funktools.LRUCache(save_exceptions=False)
+    def foo():
+        nonlocal call_count
+        call_count += 1
+        raise FooException()
+
+    with pytest.raises(FooException):
+        foo()
+    assert call_count == 1
+
+    with pytest.raises(FooException):
+        foo()
+    assert call_count == 2
+
+
+def test_multi_cache_dump_and_load_keep_recency(tmp_path: pathlib.Path) -> None:
+    call_count = 0
+
+    def foo(x) -> int:
+        nonlocal call_count
+        call_count += 1
+        return x
+
+    foo0 = funktools.LRUCache(size=2)(foo)
+    for x in [0, 1, 0]:
+        foo0(x)
+    foo0.cache_dump(tmp_path / 'snapshot')
+    assert call_count == 2
+
+    foo1 = funktools.LRUCache(size=2)(foo)
+    foo1.cache_load(tmp_path / 'snapshot')
+    assert [*foo1.enter_context.exit_context_by_key] == [((1,), ()), ((0,), ())]
+    assert foo1(0) == 0
+    assert foo1(1) == 1
+    assert call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_async_cache_dump_and_load_keep_recency(tmp_path: pathlib.Path) -> None:
+    call_count = 0
+
+    async def foo(x) -> int:
+        nonlocal call_count
+        call_count += 1
+        return x
+
+    foo0 = funktools.LRUCache(size=2)(foo)
+    for x in [0, 1, 0]:
+        await foo0(x)
+    foo0.cache_dump(tmp_path / 'snapshot')
+    assert call_count == 2
+
+    foo1 = funktools.LRUCache(size=2)(foo)
+    foo1.cache_load(tmp_path / 'snapshot')
+    assert [*foo1.enter_context.exit_context_by_key] == [((1,), ()), ((0,), ())]
+    assert await foo1(0) == 0
+    assert await foo1(1) == 1
+    assert call_count == 2
+
+
+def test_async_cache_load_without_running_loop(tmp_path: pathlib.Path) -> None:
+    call_count = 0
+
+    async def foo(x) -> int:
+        nonlocal call_count
+        call_count += 1
+        return x
+
+    foo0 = funktools.LRUCache()(foo)
+    asyncio.run(foo0(0))
+    foo0.cache_dump(tmp_path / 'snapshot')
+
+    foo1 = funktools.LRUCache()(foo)
+    foo1.cache_load(tmp_path / 'snapshot')
+    assert asyncio.run(foo1(0)) == 0
+    assert call_count == 1
+
+
+def test_multi_cache_load_rejects_other_files(tmp_path: pathlib.Path) -> None:
+    (tmp_path / 'snapshot').write_bytes(pickle.dumps('foo'))
+
+    @funktools.LRUCache()
+    def foo() -> None:
+        ...
+
+    with pytest.raises(ValueError):
+        foo.cache_load(tmp_path / 'snapshot')
+
+
+def test_multi_snapshot_path_loads_on_first_use(tmp_path: pathlib.Path) -> None:
+    call_count = 0
+
+    def foo(x) -> int:
+        nonlocal call_count
+        call_count += 1
+        return x
+
+    foo0 = funktools.LRUCache(snapshot_path=tmp_path / 'snapshot')(foo)
+    foo0.cache_save_snapshot()
+    assert not (tmp_path / 'snapshot').exists()
+
+    foo0(0)
+    foo0.cache_save_snapshot()
+
+    foo1 = funktools.LRUCache(snapshot_path=tmp_path / 'snapshot')(foo)
+    assert foo1(0) == 0
+    assert call_count == 1
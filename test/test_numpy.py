@@ -0,0 +1,64 @@
+import pathlib
+import tempfile
+
+import pytest
+
+import funktools
+
+numpy = pytest.importorskip('numpy')
+
+
+@pytest.mark.parametrize('array', [
+    numpy.arange(12, dtype=numpy.int16).reshape(3, 4),
+    numpy.asfortranarray(numpy.arange(12, dtype=numpy.float32).reshape(3, 4)),
+    numpy.array(3.5),
+    numpy.zeros((0, 2), dtype=numpy.complex64),
+    numpy.array([(1, 2.0)], dtype=[('a', '<i4'), ('b', '>f8')]),
+])
+def test_round_trip(array) -> None:
+    loaded = funktools.loads_array(funktools.dumps_array(array))
+    assert loaded.dtype == array.dtype
+    assert loaded.flags.f_contiguous == array.flags.f_contiguous
+    numpy.testing.assert_array_equal(loaded, array)
+
+
+def test_loads_without_copy() -> None:
+    value = bytearray(funktools.dumps_array(numpy.arange(4)))
+    loaded = funktools.loads_array(memoryview(value).toreadonly())
+    value[-8:] = (7).to_bytes(8, 'little')
+    assert loaded[-1] == 7
+    assert not loaded.flags.writeable
+
+
+def test_dumps_refuses_objects() -> None:
+    with pytest.raises(ValueError):
+        funktools.dumps_array(numpy.array([object()]))
+
+
+def test_loads_refuses_other_formats() -> None:
+    with pytest.raises(ValueError):
+        funktools.loads_array(b'not an array')
+
+
+def test_sqlite_cache_serves_arrays_from_blobs() -> None:
+    call_count = 0
+
+    with tempfile.TemporaryDirectory() as directory:
+        @funktools.SQLiteCache(
+            blob_directory=directory,
+            blob_threshold=0,
+            db_path=pathlib.Path(directory) / 'db',
+            dumps_value=funktools.dumps_array,
+            loads_value=funktools.loads_array,
+        )
+        def foo(n) -> numpy.ndarray:
+            nonlocal call_count
+            call_count += 1
+            return numpy.arange(n, dtype=numpy.uint8)
+
+        numpy.testing.assert_array_equal(foo(1024), numpy.arange(1024, dtype=numpy.uint8))
+        cached = foo(1024)
+        numpy.testing.assert_array_equal(cached, numpy.arange(1024, dtype=numpy.uint8))
+        assert cached.dtype == numpy.uint8
+        assert not cached.flags.writeable
+        assert call_count == 1
@@ -1,6 +1,17 @@
 import asyncio
+import concurrent.futures
 import inspect
+import itertools
+import os
+import pathlib
+import pickle
+import sqlite3
+import subprocess
+import sys
 import tempfile
+import textwrap
+import time
+import unittest.mock
 
 import pytest
 
@@ -33,6 +44,12 @@ def db_path() -> str:
         yield f.name
 
 
+@pytest.fixture
+def m_time() -> unittest.mock.MagicMock:
+    with unittest.mock.patch.object(module.time, 'time', autospec=True, side_effect=itertools.count()) as m_time:
+        yield m_time
+
+
 @pytest.mark.asyncio
 async def test_async_zero_args(db_path: str) -> None:
     call_count = 0
@@ -226,3 +243,461 @@ def test_multi_staticmethod() -> None:
     assert call_count == 1
 
 
+def test_multi_write_behind_is_visible_before_flush(db_path) -> None:
+    call_count = 0
+
+    @funktools.SQLiteCache(db_path=db_path, write_behind=True, flush_interval=60.0)
+    def foo(_) -> int:
+        nonlocal call_count
+        call_count += 1
+        return 42
+
+    assert foo(0) == 42
+    assert foo(0) == 42
+    assert call_count == 1
+
+    table_name = foo.enter_context.backend.table_name
+    assert sqlite3.connect(db_path).execute(f'SELECT COUNT(*) FROM `{table_name}`').fetchall() == [(0,)]
+
+    foo.enter_context.write_behind.flush()
+    assert sqlite3.connect(db_path).execute(f'SELECT key FROM `{table_name}`').fetchall() == [(repr(((0,), ())),)]
+
+
+def test_multi_write_behind_flushes_inline_when_max_pending_reached(db_path) -> None:
+
+    @funktools.SQLiteCache(db_path=db_path, write_behind=True, flush_interval=60.0, max_pending=2)
+    def foo(x) -> int:
+        return x
+
+    foo(0)
+    assert foo.enter_context.write_behind.pending
+    foo(1)
+    assert not foo.enter_context.write_behind.pending
+
+    table_name = foo.enter_context.backend.table_name
+    assert sqlite3.connect(db_path).execute(f'SELECT COUNT(*) FROM `{table_name}`').fetchall() == [(2,)]
+
+
+def test_multi_write_behind_bounds_pending_by_default(db_path) -> None:
+
+    @funktools.SQLiteCache(db_path=db_path, write_behind=True, flush_interval=60.0, flush_size=2)
+    def foo(x) -> int:
+        return x
+
+    assert foo.enter_context.write_behind.max_pending == 8
+
+
+def test_multi_l1_serves_hits_from_memory(db_path) -> None:
+    call_count = 0
+
+    @funktools.SQLiteCache(db_path=db_path, l1_size=1)
+    def foo(x) -> int:
+        nonlocal call_count
+        call_count += 1
+        return x
+
+    assert foo(0) == 0
+    table_name = foo.enter_context.next_enter_context.backend.table_name
+    sqlite3.connect(db_path, isolation_level=None).execute(f'DELETE FROM `{table_name}`')
+
+    assert foo(0) == 0
+    assert call_count == 1
+
+
+def test_multi_l1_reads_through_to_sqlite(db_path) -> None:
+    call_count = 0
+
+    @funktools.SQLiteCache(db_path=db_path, l1_size=1)
+    def foo(x) -> int:
+        nonlocal call_count
+        call_count += 1
+        return x
+
+    foo(0)
+    foo(1)
+    foo(2)
+    assert call_count == 3
+
+    assert foo(0) == 0
+    assert call_count == 3
+
+
+def test_multi_l1_does_not_save_exceptions(db_path) -> None:
+    call_count = 0
+
+    @funktools.SQLiteCache(db_path=db_path, l1_size=1)
+    def foo() -> None:
+        nonlocal call_count
+        call_count += 1
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        foo()
+    with pytest.raises(ValueError):
+        foo()
+    assert call_count == 2
+
+
+def test_multi_max_rows_evicts_least_recently_accessed(db_path, m_time) -> None:
+    call_count = 0
+
+    @funktools.SQLiteCache(db_path=db_path, evict_every=1, max_rows=2, touch_sample=1.0, touch_size=1)
+    def foo(x) -> int:
+        nonlocal call_count
+        call_count += 1
+        return x
+
+    foo(0)
+    foo(1)
+    foo(0)
+    foo(2)
+    assert call_count == 3
+
+    foo(0)
+    foo(2)
+    assert call_count == 3
+
+    foo(1)
+    assert call_count == 4
+
+
+def test_multi_max_bytes_evicts_least_recently_accessed(db_path, m_time) -> None:
+
+    @funktools.SQLiteCache(db_path=db_path, evict_every=1, max_bytes=64, touch_sample=1.0, touch_size=1)
+    def foo(x) -> str:
+        return 'x' * x
+
+    foo(30)
+    foo(31)
+
+    table_name = foo.enter_context.backend.table_name
+    assert sqlite3.connect(db_path).execute(f'SELECT key FROM `{table_name}`').fetchall() == [(repr(((31,), ())),)]
+
+
+def test_multi_method_instances_share_one_table(db_path) -> None:
+
+    class Foo:
+        def __init__(self, name: str) -> None:
+            self.name = name
+
+        @funktools.SQLiteCache(db_path=db_path, dumps_namespace=lambda instance: instance.name)
+        def foo(self) -> None:
+            ...
+
+    foo0, foo1 = Foo('foo0'), Foo('foo1')
+    foo0.foo()
+    foo1.foo()
+
+    connection = sqlite3.connect(db_path)
+    assert connection.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name != '__funktools_stats__'"
+    ).fetchall() == [(1,)]
+    table_name = foo0.foo.enter_context.backend.table_name
+    assert connection.execute(f'SELECT namespace FROM `{table_name}` ORDER BY namespace').fetchall() == [
+        ('foo0',), ('foo1',)
+    ]
+
+
+def test_multi_keyword_only_args_are_part_of_key(db_path) -> None:
+    call_count = 0
+
+    @funktools.SQLiteCache(db_path=db_path)
+    def foo(*, x) -> int:
+        nonlocal call_count
+        call_count += 1
+        return x
+
+    assert foo(x=0) == 0
+    assert foo(x=1) == 1
+    assert call_count == 2
+
+
+def test_multi_digest_size_stores_fixed_size_keys(db_path) -> None:
+    call_count = 0
+
+    @funktools.SQLiteCache(db_path=db_path, digest_size=16)
+    def foo(x) -> int:
+        nonlocal call_count
+        call_count += 1
+        return len(x)
+
+    assert foo('x' * 1024) == 1024
+    assert foo('x' * 1024) == 1024
+    assert call_count == 1
+
+    table_name = foo.enter_context.backend.table_name
+    assert sqlite3.connect(db_path).execute(
+        f'SELECT LENGTH(key), canonical_key FROM `{table_name}`'
+    ).fetchall() == [(16, None)]
+
+
+def test_multi_verify_key_treats_canonical_key_mismatch_as_miss(db_path) -> None:
+    call_count = 0
+
+    @funktools.SQLiteCache(db_path=db_path, digest_size=16, verify_key=True)
+    def foo(x) -> int:
+        nonlocal call_count
+        call_count += 1
+        return x
+
+    foo(0)
+    table_name = foo.enter_context.backend.table_name
+    sqlite3.connect(db_path, isolation_level=None).execute(f"UPDATE `{table_name}` SET canonical_key = 'collision'")
+
+    foo(0)
+    assert call_count == 2
+    foo(0)
+    assert call_count == 2
+
+
+def test_multi_lease_waits_for_value_from_lease_holder(db_path) -> None:
+    call_count = 0
+
+    @funktools.SQLiteCache(db_path=db_path, lease_duration=60.0, lease_poll_interval=0.01)
+    def foo(x) -> int:
+        nonlocal call_count
+        call_count += 1
+        return x
+
+    table_name = foo.enter_context.backend.table_name
+    key = repr(((0,), ()))
+    connection = sqlite3.connect(db_path, isolation_level=None)
+    connection.execute(f"INSERT INTO `{table_name}__lease` VALUES ('', ?, ?)", (key, time.time() + 60.0))
+
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        future = executor.submit(foo, 0)
+        time.sleep(0.05)
+        assert not future.done()
+        connection.execute(f"INSERT INTO `{table_name}` (namespace, key, value) VALUES ('', ?, '42')", (key,))
+        assert future.result() == 42
+
+    assert call_count == 0
+
+
+def test_multi_lease_reclaims_expired_lease(db_path) -> None:
+    call_count = 0
+
+    @funktools.SQLiteCache(db_path=db_path, lease_duration=60.0)
+    def foo(x) -> int:
+        nonlocal call_count
+        call_count += 1
+        return x
+
+    table_name = foo.enter_context.backend.table_name
+    connection = sqlite3.connect(db_path, isolation_level=None)
+    connection.execute(f"INSERT INTO `{table_name}__lease` VALUES ('', ?, 0.0)", (repr(((0,), ())),))
+
+    assert foo(0) == 0
+    assert call_count == 1
+    assert connection.execute(f'SELECT COUNT(*) FROM `{table_name}__lease`').fetchall() == [(0,)]
+
+
+def test_multi_cache_get_many(db_path) -> None:
+
+    @funktools.SQLiteCache(db_path=db_path, get_many_chunk_size=2)
+    def foo(x, *, y=0) -> int:
+        return x + y
+
+    foo(0)
+    foo(1, y=1)
+    foo(2)
+
+    assert foo.cache_get_many([((0,), {}), ((1,), {'y': 1}), ((1,), {}), ((2,), {}), ((3,), {})], default=-1) == [
+        0, 2, -1, 2, -1
+    ]
+
+
+def test_multi_method_cache_get_many(db_path) -> None:
+
+    class Foo:
+        @funktools.SQLiteCache(db_path=db_path, dumps_namespace=lambda instance: 'foo')
+        def foo(self, x) -> int:
+            return x
+
+    foo = Foo()
+    foo.foo(0)
+    assert foo.foo.cache_get_many([((0,), {}), ((1,), {})]) == [0, None]
+
+
+def test_multi_cache_prefetch_populates_l1(db_path) -> None:
+    call_count = 0
+
+    @funktools.SQLiteCache(db_path=db_path, l1_size=2)
+    def foo(x) -> int:
+        nonlocal call_count
+        call_count += 1
+        return x
+
+    for x in range(3):
+        foo(x)
+    foo.cache_prefetch([((0,), {}), ((1,), {})])
+
+    table_name = foo.enter_context.next_enter_context.backend.table_name
+    sqlite3.connect(db_path, isolation_level=None).execute(f'DELETE FROM `{table_name}`')
+
+    assert foo(0) == 0
+    assert foo(1) == 1
+    assert call_count == 3
+
+
+def test_async_cache_prefetch_without_running_loop(db_path) -> None:
+    call_count = 0
+
+    @funktools.SQLiteCache(db_path=db_path, l1_size=2)
+    async def foo(x) -> int:
+        nonlocal call_count
+        call_count += 1
+        return x
+
+    asyncio.run(foo(0))
+    foo.enter_context.exit_context_by_key.clear()
+    foo.cache_prefetch([((0,), {})])
+
+    table_name = foo.enter_context.next_enter_context.backend.table_name
+    sqlite3.connect(db_path, isolation_level=None).execute(f'DELETE FROM `{table_name}`')
+
+    assert asyncio.run(foo(0)) == 0
+    assert call_count == 1
+
+
+def test_multi_fingerprint_invalidates_changed_function(db_path) -> None:
+
+    @funktools.SQLiteCache(db_path=db_path, fingerprint=True)
+    def foo() -> int:
+        return 1
+
+    assert foo() == 1
+
+    @funktools.SQLiteCache(db_path=db_path, fingerprint=True)
+    def foo() -> int:
+        return 2
+
+    assert foo() == 2
+
+
+def test_multi_fingerprint_keeps_unchanged_function(db_path) -> None:
+    call_count = 0
+
+    @funktools.SQLiteCache(db_path=db_path, fingerprint=True)
+    def foo() -> None:
+        nonlocal call_count
+        call_count += 1
+
+    foo()
+
+    @funktools.SQLiteCache(db_path=db_path, fingerprint=True)
+    def foo() -> None:
+        nonlocal call_count
+        call_count += 1
+
+    foo()
+    assert call_count == 1
+
+
+def test_multi_fingerprint_ignores_hash_seed() -> None:
+    script = textwrap.dedent('''
+        import funktools._sqlite_cache
+
+        def foo(x, y=frozenset({'alpha', 'beta'})):
+            return x in {'alpha', 'beta', 'gamma', 'delta'} and (x, {'epsilon', 'zeta'}) != y
+
+        print(funktools._sqlite_cache.fingerprint(foo))
+    ''')
+    fingerprints = {
+        subprocess.run(
+            [sys.executable, '-c', script],
+            capture_output=True,
+            check=True,
+            env={**os.environ, 'PYTHONHASHSEED': seed, 'PYTHONPATH': str(pathlib.Path(__file__).parents[1])},
+            text=True,
+        ).stdout
+        for seed in ['1', '2']
+    }
+    assert len(fingerprints) == 1
+
+
+@pytest.mark.parametrize('version, call_count', [('0', 1), ('1', 2)])
+def test_multi_version_invalidates_other_versions(db_path, version, call_count) -> None:
+    _call_count = 0
+
+    @funktools.SQLiteCache(db_path=db_path, version='0')
+    def foo() -> None:
+        nonlocal _call_count
+        _call_count += 1
+
+    foo()
+
+    @funktools.SQLiteCache(db_path=db_path, version=version)
+    def foo() -> None:
+        nonlocal _call_count
+        _call_count += 1
+
+    foo()
+    assert _call_count == call_count
+
+
+def test_multi_blob_directory_serves_large_values_from_files(db_path) -> None:
+    call_count = 0
+    loaded = []
+
+    def loads_value(value: memoryview) -> bytes:
+        loaded.append(type(value))
+        return pickle.loads(value)
+
+    with tempfile.TemporaryDirectory() as blob_directory:
+        @funktools.SQLiteCache(
+            blob_directory=blob_directory,
+            blob_threshold=64,
+            db_path=db_path,
+            dumps_value=pickle.dumps,
+            loads_value=loads_value,
+        )
+        def foo(x) -> bytes:
+            nonlocal call_count
+            call_count += 1
+            return b'x' * x
+
+        assert foo(1024) == foo(1024) == b'x' * 1024
+        assert foo(1) == foo(1) == b'x'
+        assert call_count == 2
+        assert loaded == [memoryview, bytes]
+        assert len([*pathlib.Path(blob_directory).glob('*/*/*')]) == 1
+
+
+def test_multi_shards_spread_rows_across_files(db_path) -> None:
+    call_count = 0
+
+    @funktools.SQLiteCache(db_path=db_path, shards=2)
+    def foo(x) -> int:
+        nonlocal call_count
+        call_count += 1
+        return x
+
+    assert [foo(x) for x in range(32)] == [foo(x) for x in range(32)] == [*range(32)]
+    assert call_count == 32
+
+    table_name = foo.enter_context.backend.backends[0].table_name
+    counts = [
+        sqlite3.connect(path).execute(f'SELECT COUNT(*) FROM `{table_name}`').fetchone()[0]
+        for path in [db_path, f'{db_path}.1']
+    ]
+    assert 0 < counts[0] < 32 and sum(counts) == 32
+    pathlib.Path(f'{db_path}.1').unlink()
+
+
+def test_multi_flush_stats_adds_counts_of_every_thread(db_path) -> None:
+
+    @funktools.SQLiteCache(db_path=db_path)
+    def foo(x) -> int:
+        return x
+
+    foo(0)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        [*executor.map(foo, [0, 0, 1])]
+
+    backend = foo.enter_context.backend
+    backend.flush_stats()
+    backend.flush_stats()
+    assert sqlite3.connect(db_path).execute(
+        'SELECT SUM(hits), SUM(misses) FROM `__funktools_stats__` WHERE table_name = ?', (backend.table_name,)
+    ).fetchall() == [(2, 2)]
@@ -1,5 +1,13 @@
 import asyncio
+import concurrent.futures
+import functools
 import inspect
+import multiprocessing
+import sys
+import tempfile
+import threading
+import time
+import typing
 import unittest.mock
 import pytest
 
@@ -53,6 +61,7 @@ async def test_async_sleeps_when_max_herd_exceeded_in_window(m_asyncio, m_time)
         ...
 
     m_time.time.return_value = 0.0
+    m_time.monotonic.return_value = 0.0
     await foo()
     m_asyncio.sleep.assert_not_called()
 
@@ -107,3 +116,629 @@ async def test_exception_cuts_value_in_half(start) -> None:
             tg.create_task(foo())
         assert n_running == start // 2
         event.set()
+
+
+@pytest.mark.asyncio
+async def test_async_rate_admits_burst_then_sleeps(m_asyncio, m_time) -> None:
+
+    @funktools.Throttle(rate=2.0, burst=2)
+    async def foo():
+        ...
+
+    m_time.monotonic.return_value = 0.0
+    await foo()
+    await foo()
+    m_asyncio.sleep.assert_not_called()
+
+    await foo()
+    m_asyncio.sleep.assert_called_once_with(0.5)
+
+    m_asyncio.sleep.reset_mock()
+    m_time.monotonic.return_value = 10.0
+    await foo()
+    m_asyncio.sleep.assert_not_called()
+
+
+def test_multi_rate_reserves_spaced_admissions(m_time) -> None:
+
+    @funktools.Throttle(rate=4.0)
+    def foo():
+        ...
+
+    m_time.monotonic.return_value = 0.0
+    for _ in range(3):
+        foo()
+    assert m_time.sleep.call_args_list == [unittest.mock.call(0.25), unittest.mock.call(0.5)]
+
+
+@pytest.mark.asyncio
+async def test_async_waiters_admitted_in_arrival_order() -> None:
+    events = [asyncio.Event() for _ in range(4)]
+    order = []
+
+    @funktools.Throttle(additive_increase=0)
+    async def foo(i: int):
+        order.append(i)
+        await events[i].wait()
+
+    async with asyncio.TaskGroup() as tg:
+        for i in range(3):
+            tg.create_task(foo(i))
+        assert order == [0]
+
+        events[0].set()
+        await asyncio.sleep(0)
+        # The hold freed by 0 was handed to 1 before 1 got to run, so 3 may not pass it.
+        tg.create_task(foo(3))
+        for event in events:
+            event.set()
+
+    assert order == [0, 1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_async_cancelled_waiter_passes_on_hold() -> None:
+    event = asyncio.Event()
+    order = []
+
+    @funktools.Throttle(additive_increase=0)
+    async def foo(i: int):
+        order.append(i)
+        await event.wait()
+
+    async with asyncio.TaskGroup() as tg:
+        tasks = [tg.create_task(foo(i)) for i in range(3)]
+        tasks[1].cancel()
+        event.set()
+
+    assert order == [0, 2]
+
+
+@pytest.mark.asyncio
+async def test_async_pane_waiters_admitted_in_arrival_order(m_asyncio, m_time) -> None:
+    order = []
+
+    @funktools.Throttle(per_window=1, window=1.0)
+    async def foo(i: int):
+        order.append(i)
+
+    m_time.time.return_value = 0.0
+    m_time.monotonic.return_value = 0.0
+    await foo(0)
+
+    sleep = asyncio.Event()
+
+    async def wait(_) -> None:
+        await sleep.wait()
+
+    m_asyncio.sleep.side_effect = wait
+    async with asyncio.TaskGroup() as tg:
+        for i in range(1, 4):
+            tg.create_task(foo(i))
+        assert order == [0]
+        m_asyncio.sleep.assert_called_once_with(1.0)
+        sleep.set()
+
+    assert order == [0, 1, 2, 3]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('algorithm', ['gradient', 'vegas'])
+async def test_async_latency_algorithm_adapts_value(algorithm, m_time) -> None:
+    event = asyncio.Event()
+
+    @funktools.Throttle(algorithm=algorithm, start=8)
+    async def foo():
+        await event.wait()
+
+    async def run(latency: float) -> int:
+        event.clear()
+        m_time.monotonic.return_value = 0.0
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(foo.enter_context.semaphore.value):
+                tg.create_task(foo())
+            m_time.monotonic.return_value = latency
+            event.set()
+        return foo.enter_context.semaphore.value
+
+    assert (grown := await run(1.0)) > 8
+    assert await run(1.0) > grown
+    assert await run(10.0) < grown
+
+
+@pytest.mark.asyncio
+async def test_async_min_latency_ages_toward_higher_latency(m_time) -> None:
+    event = asyncio.Event()
+
+    @funktools.Throttle(algorithm='vegas')
+    async def foo():
+        await event.wait()
+
+    async def run(latency: float) -> float:
+        event.clear()
+        m_time.monotonic.return_value = 0.0
+        task = asyncio.get_running_loop().create_task(foo())
+        m_time.monotonic.return_value = latency
+        event.set()
+        await task
+        return foo.enter_context.semaphore.min_latency
+
+    assert await run(1.0) == 1.0
+    for _ in range(100):
+        min_latency = await run(10.0)
+    assert 5.0 < min_latency < 10.0
+    assert await run(0.5) == 0.5
+
+
+@pytest.mark.asyncio
+async def test_async_key_throttles_keys_separately() -> None:
+    event = asyncio.Event()
+    running = []
+
+    @funktools.Throttle(additive_increase=0, key=lambda tenant, i: tenant)
+    async def foo(tenant: str, i: int):
+        running.append((tenant, i))
+        await event.wait()
+
+    async with asyncio.TaskGroup() as tg:
+        for i in range(2):
+            for tenant in ['a', 'b']:
+                tg.create_task(foo(tenant, i))
+        assert running == [('a', 0), ('b', 0)]
+        event.set()
+
+
+@pytest.mark.asyncio
+async def test_async_key_drops_least_recently_used() -> None:
+
+    @funktools.Throttle(key=lambda tenant: tenant, max_keys=2)
+    async def foo(tenant: str):
+        ...
+
+    for tenant in ['a', 'b', 'a', 'c']:
+        await foo(tenant)
+
+    assert [*foo.enter_context.semaphore_by_key] == ['a', 'c']
+
+
+@pytest.mark.asyncio
+async def test_async_key_keeps_busy_semaphores() -> None:
+    event = asyncio.Event()
+    running = []
+
+    @funktools.Throttle(key=lambda tenant: tenant, max_holders=1, max_keys=2)
+    async def foo(tenant: str):
+        running.append(tenant)
+        await event.wait()
+
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(foo('a'))
+        tg.create_task(foo('b'))
+        tg.create_task(foo('c'))
+        # 'a' still holds its only slot, so a second call with its key must wait for it.
+        tg.create_task(foo('a'))
+        assert running == ['a', 'b', 'c']
+        assert [*foo.enter_context.semaphore_by_key] == ['b', 'c', 'a']
+        event.set()
+
+    assert running == ['a', 'b', 'c', 'a']
+
+
+def test_multi_key_keeps_semaphores_pinned_until_acquired() -> None:
+    lock = threading.Lock()
+    running = {'a': 0, 'b': 0}
+    peak = {'a': 0, 'b': 0}
+
+    def cost(tenant: str) -> int:
+        # Widens the gap between looking up the semaphore of a key and acquiring it.
+        time.sleep(0.01)
+        return 1
+
+    @funktools.Throttle(cost=cost, key=lambda tenant: tenant, max_holders=1, max_keys=1)
+    def foo(tenant: str):
+        with lock:
+            running[tenant] += 1
+            peak[tenant] = max(peak[tenant], running[tenant])
+        time.sleep(0.01)
+        with lock:
+            running[tenant] -= 1
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        [*executor.map(foo, 'abababab')]
+
+    assert peak == {'a': 1, 'b': 1}
+
+
+@pytest.mark.asyncio
+async def test_async_cost_holds_units_in_order() -> None:
+    events = {cost: asyncio.Event() for cost in [1, 2, 3]}
+    running = []
+
+    @funktools.Throttle(additive_increase=0, cost=lambda cost: cost, start=4)
+    async def foo(cost: int):
+        running.append(cost)
+        await events[cost].wait()
+
+    async with asyncio.TaskGroup() as tg:
+        for cost in [3, 2, 1]:
+            tg.create_task(foo(cost))
+        # 1 would fit beside 3, but may not pass 2.
+        assert running == [3]
+
+        events[3].set()
+        for _ in range(2):
+            await asyncio.sleep(0)
+        assert running == [3, 2, 1]
+        for event in events.values():
+            event.set()
+
+
+@pytest.mark.asyncio
+async def test_async_cost_counts_against_window(m_asyncio, m_time) -> None:
+
+    @funktools.Throttle(cost=lambda cost: cost, per_window=4, window=1.0)
+    async def foo(cost: int):
+        ...
+
+    m_time.time.return_value = 0.0
+    m_time.monotonic.return_value = 0.0
+    await foo(3)
+    await foo(1)
+    m_asyncio.sleep.assert_not_called()
+
+    await foo(2)
+    m_asyncio.sleep.assert_called_once_with(1.0)
+
+
+@pytest.mark.asyncio
+async def test_async_cost_counts_against_window_of_smaller_panes(m_asyncio, m_time) -> None:
+
+    @funktools.Throttle(cost=lambda cost: cost, per_pane=1, per_window=10, window=5.0)
+    async def foo(cost: int):
+        ...
+
+    m_time.time.return_value = 0.0
+    m_time.monotonic.return_value = 0.0
+    await foo(5)
+    await foo(5)
+    m_asyncio.sleep.assert_not_called()
+
+    await foo(5)
+    m_asyncio.sleep.assert_called_once_with(5.0)
+
+
+def test_multi_cost_counts_against_rate(m_time) -> None:
+
+    @funktools.Throttle(cost=lambda cost: cost, rate=4.0)
+    def foo(cost: int):
+        ...
+
+    m_time.monotonic.return_value = 0.0
+    foo(1)
+    foo(2)
+    assert m_time.sleep.call_args_list == [unittest.mock.call(0.5)]
+
+
+@pytest.mark.asyncio
+async def test_async_priority_serves_lowest_first() -> None:
+    event = asyncio.Event()
+    order = []
+
+    @funktools.Throttle(additive_increase=0, priority=lambda priority: priority)
+    async def foo(priority: int):
+        order.append(priority)
+        await event.wait()
+
+    async with asyncio.TaskGroup() as tg:
+        for priority in [0, 2, 3, 1]:
+            tg.create_task(foo(priority))
+        token = funktools.Throttle.priority_var.set(-1)
+        tg.create_task(foo(4))
+        funktools.Throttle.priority_var.reset(token)
+        event.set()
+
+    assert order == [0, 4, 1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_async_aging_serves_long_waiters(m_time) -> None:
+    event = asyncio.Event()
+    order = []
+
+    @funktools.Throttle(additive_increase=0, aging=1.0, priority=lambda priority: priority)
+    async def foo(priority: int):
+        order.append(priority)
+        await event.wait()
+
+    async with asyncio.TaskGroup() as tg:
+        m_time.monotonic.return_value = 0.0
+        for priority in [0, 2]:
+            tg.create_task(foo(priority))
+        m_time.monotonic.return_value = 3.0
+        tg.create_task(foo(1))
+        event.set()
+
+    assert order == [0, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_async_max_wait_rejects_long_rate_wait(m_asyncio, m_time) -> None:
+
+    @funktools.Throttle(max_wait=0.5, rate=1.0)
+    async def foo():
+        ...
+
+    m_time.monotonic.return_value = 0.0
+    await foo()
+    with pytest.raises(module.AIMDSemaphore.exception_t):
+        await foo()
+
+    m_time.monotonic.return_value = 1.0
+    await foo()
+    m_asyncio.sleep.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_async_deadline_rejects_estimated_wait(m_time) -> None:
+    event = asyncio.Event()
+
+    @funktools.Throttle(additive_increase=0)
+    async def foo():
+        m_time.monotonic.return_value += 1.0
+        await event.wait()
+
+    m_time.monotonic.return_value = 0.0
+    event.set()
+    await foo()
+    event.clear()
+
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(foo())
+        token = funktools.Throttle.deadline_var.set(m_time.monotonic.return_value + 0.1)
+        with pytest.raises(module.AIMDSemaphore.exception_t):
+            await foo()
+        funktools.Throttle.deadline_var.reset(token)
+        assert foo.enter_context.semaphore.waiters == 0
+        event.set()
+
+
+@pytest.mark.asyncio
+async def test_async_max_wait_removes_expired_waiter() -> None:
+    event = asyncio.Event()
+    order = []
+
+    @funktools.Throttle(additive_increase=0, max_wait=0.01)
+    async def foo(i: int):
+        order.append(i)
+        await event.wait()
+
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(foo(0))
+        with pytest.raises(module.AIMDSemaphore.exception_t):
+            await foo(1)
+        assert not foo.enter_context.semaphore.holders_queue
+        event.set()
+
+    await foo(2)
+    assert order == [0, 2]
+
+
+def test_multi_max_wait_removes_expired_waiter() -> None:
+    event = threading.Event()
+
+    @funktools.Throttle(additive_increase=0, max_wait=0.01)
+    def foo():
+        event.wait()
+
+    thread = threading.Thread(target=foo)
+    thread.start()
+    while not foo.enter_context.semaphore.holders:
+        time.sleep(0.001)
+    with pytest.raises(module.AIMDSemaphore.exception_t):
+        foo()
+    assert not foo.enter_context.semaphore.holders_queue
+    event.set()
+    thread.join()
+
+
+def _call_shared(db_path: str) -> None:
+
+    @funktools.Throttle(max_wait=0.0, per_window=2, shared=db_path, window=60.0)
+    def foo():
+        ...
+
+    try:
+        foo()
+    except module.AIMDSemaphore.exception_t:
+        sys.exit(1)
+
+
+def test_multi_shared_per_window_across_processes() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        processes = [
+            multiprocessing.get_context('fork').Process(target=_call_shared, args=(f'{directory}/throttle.db',))
+            for _ in range(3)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+    assert sorted(process.exitcode for process in processes) == [0, 0, 1]
+
+
+@pytest.fixture
+def shared() -> typing.Callable[..., module.Shared]:
+    with tempfile.TemporaryDirectory() as directory:
+        yield functools.partial(
+            module.Shared, db_path=f'{directory}/throttle.db', max_holders=1, name='foo', per_window=2, window=60.0,
+        )
+
+
+def test_shared_max_holders(shared) -> None:
+    a, b = shared(), shared()
+    assert a.acquire(1) == 0.0
+    assert b.acquire(1) == a.poll
+    a.release(1)
+    assert b.acquire(1) == 0.0
+
+
+def test_shared_drops_holders_of_exited_processes(shared) -> None:
+    process = multiprocessing.get_context('fork').Process(target=lambda: None)
+    process.start()
+    process.join()
+
+    a = shared()
+    a.connection.execute(
+        'INSERT INTO `__funktools_throttle_holders__` (name, pid, holders) VALUES (?, ?, 1)', (a.name, process.pid)
+    )
+    assert a.acquire(1) == 0.0
+
+
+def test_shared_per_window(shared, m_time) -> None:
+    a = shared(max_holders=sys.maxsize)
+    m_time.time.return_value = 0.0
+    assert a.acquire(1) == 0.0
+    m_time.time.return_value = 1.0
+    assert a.acquire(1) == 0.0
+    assert a.acquire(1) == 59.0
+    m_time.time.return_value = 60.0
+    assert a.acquire(1) == 0.0
+
+
+def test_shared_retries_while_locked(shared) -> None:
+    a, b = shared(), shared()
+    b.connection.execute('BEGIN IMMEDIATE')
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        future = executor.submit(a.acquire, 1)
+        time.sleep(a.poll * 5)
+        assert not future.done()
+        b.connection.execute('ROLLBACK')
+        assert future.result() == 0.0
+
+
+def _shared_foo(db_path: str, started: asyncio.Event, event: asyncio.Event):
+
+    @funktools.Throttle(max_holders=1, max_wait=0.0, shared=db_path)
+    async def foo():
+        started.set()
+        await event.wait()
+
+    return foo
+
+
+@pytest.mark.asyncio
+async def test_async_shared_max_holders() -> None:
+    started, event = asyncio.Event(), asyncio.Event()
+
+    with tempfile.TemporaryDirectory() as directory:
+        foo, bar = (_shared_foo(f'{directory}/throttle.db', started, event) for _ in range(2))
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(foo())
+            await started.wait()
+            with pytest.raises(module.AIMDSemaphore.exception_t):
+                await bar()
+            event.set()
+
+        await bar()
+class RetryAfter(Exception):
+
+    def __init__(self, retry_after: float) -> None:
+        self.retry_after = retry_after
+
+
+@pytest.mark.asyncio
+async def test_async_backoff_from_pauses_admission(m_asyncio, m_time) -> None:
+
+    @funktools.Throttle(backoff_from=lambda exc: getattr(exc, 'retry_after', None), start=4)
+    async def foo(exc: Exception | None):
+        if exc is not None:
+            raise exc
+
+    m_time.monotonic.return_value = 0.0
+    with pytest.raises(ValueError):
+        await foo(ValueError())
+    await foo(None)
+    m_asyncio.sleep.assert_not_called()
+
+    with pytest.raises(RetryAfter):
+        await foo(RetryAfter(5.0))
+    m_time.monotonic.return_value = 1.0
+
+    async def sleep(delay: float) -> None:
+        m_time.monotonic.return_value += delay
+
+    m_asyncio.sleep.side_effect = sleep
+    await foo(None)
+    m_asyncio.sleep.assert_called_once_with(4.0)
+
+
+@pytest.mark.asyncio
+async def test_async_congestion_leaves_value() -> None:
+
+    @funktools.Throttle(congestion=lambda exc: not isinstance(exc, KeyError), start=4)
+    async def foo(exc: Exception):
+        raise exc
+
+    with pytest.raises(KeyError):
+        await foo(KeyError())
+    assert foo.enter_context.semaphore.value == 4
+
+    with pytest.raises(RetryAfter):
+        await foo(RetryAfter(0.0))
+    assert foo.enter_context.semaphore.value == 2
+
+
+@pytest.mark.asyncio
+async def test_async_snapshot_counts_admissions_waits_and_rejections(m_time) -> None:
+    event = asyncio.Event()
+
+    @funktools.Throttle(additive_increase=0, max_waiters=1)
+    async def foo():
+        await event.wait()
+
+    m_time.monotonic.return_value = 0.0
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(foo())
+        tg.create_task(foo())
+        with pytest.raises(module.AIMDSemaphore.exception_t):
+            await foo()
+
+        snapshot = funktools.Throttle.snapshots()[foo.register_key][None]
+        assert (snapshot.admitted, snapshot.holders, snapshot.rejected, snapshot.waiters) == (1, 1, 1, 1)
+        m_time.monotonic.return_value = 0.3
+        event.set()
+
+    snapshot = foo.enter_context.semaphore.snapshot()
+    assert (snapshot.admitted, snapshot.holders, snapshot.waiters) == (2, 0, 0)
+    assert dict(zip(snapshot.wait_bounds, snapshot.waits)) == {
+        bound: {0.0: 1, .5: 1}.get(bound, 0) for bound in snapshot.wait_bounds
+    }
+
+
+def test_multi_samples_at_interval(m_time) -> None:
+
+    @funktools.Throttle(max_samples=2, sample_interval=1.0)
+    def foo():
+        ...
+
+    for now in [0.0, 0.5, 1.0, 1.5, 2.0]:
+        m_time.monotonic.return_value = m_time.time.return_value = now
+        foo()
+
+    assert [(sample.time, sample.admitted) for sample in foo.enter_context.semaphore.samples] == [(1.0, 3), (2.0, 5)]
+
+
+@pytest.mark.asyncio
+async def test_async_snapshots_by_key() -> None:
+
+    @funktools.Throttle(key=lambda tenant: tenant)
+    async def foo(tenant: str):
+        ...
+
+    for tenant in ['a', 'b', 'a']:
+        await foo(tenant)
+
+    assert {
+        key: snapshot.admitted for key, snapshot in funktools.Throttle.snapshots()[foo.register_key].items()
+    } == {'a': 2, 'b': 1}